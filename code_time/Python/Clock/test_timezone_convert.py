@@ -0,0 +1,13 @@
+import io
+import json
+from timezone_convert import convert_file
+
+def test_nanosecond_timestamps_with_nulls_stay_exact(tmp_path):
+    input_file = tmp_path / "events.jsonl"
+    input_file.write_text('{"timestamp":1700000000123456789}\n{"timestamp":null}\n{"id":3}\n', encoding="utf-8")
+    output = io.StringIO()
+    assert convert_file(str(input_file), output, ["UTC"], unit="ns", file_format="jsonl") == 3
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records[0] == {"timestamp": 1700000000123456789, "UTC": "2023-11-14T22:13:20.123456789+00:00"}
+    assert records[1] == {"timestamp": None, "UTC": None}
+    assert records[2] == {"id": 3, "UTC": None}
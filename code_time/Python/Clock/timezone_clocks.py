@@ -2,13 +2,15 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import datetime
 from zoneinfo import ZoneInfo
-import pytz
 import math
 import json
 import os
-import threading
+import re
 import time
 import traceback
+import unicodedata
+from collections import Counter
+from timezones import get_timezones_grouped, TRANSITION_CACHE, get_local_time
 
 # ------------------ CONSTANTS & LOCALIZATION ------------------ #
 
@@ -100,33 +102,217 @@ def save_session(data: dict):
 
 # ------------------ TIMEZONE & GROUPING ------------------ #
 
-def get_timezones_grouped():
+def build_timezone_index(grouped_timezones: dict) -> dict:
+    """Precompute, per region in display order, each timezone with its displayed country list."""
+    timezone_index = {}
+    for region, tz_dict in sorted(grouped_timezones.items()):
+        timezone_index[region] = [
+            (tz, ", ".join(sorted(set(countries))))
+            for tz, countries in sorted(tz_dict.items())
+        ]
+    return timezone_index
+
+# ------------------ TIMEZONE SEARCH ------------------ #
+
+SEARCH_GRAM_SIZE = 3
+# Lowest n-gram similarity (Dice coefficient) at which a misspelled term still matches
+SEARCH_MIN_SIMILARITY = 0.5
+# Score of a term containing the query; misspelled matches are only shown when there is none
+SEARCH_LITERAL_SCORE = 70
+# What a term is, to order equally good matches: a city beats a country, which beats the bare ID
+SEARCH_KIND_WEIGHTS = {"city": 3, "country": 2, "abbreviation": 2, "zone": 1}
+
+def normalize_search_text(text: str) -> str:
     """
-    Retrieves all timezones, groups them by their region, 
-    and maps them to the countries that observe them.
+    Lowercase, strip accents and turn punctuation (/, _, -, ') into single spaces,
+    keeping the sign of offsets like GMT+5.
     """
-    grouped_timezones = {}
-    try:
-        for tz in pytz.all_timezones:
-            if '/' in tz:
-                region, city = tz.split('/', 1)
-            else:
-                region = 'Other'
-                city = tz
-            if region not in grouped_timezones:
-                grouped_timezones[region] = {}
-            # Gather countries
-            countries = []
-            for country_code, timezones in pytz.country_timezones.items():
-                if tz in timezones:
-                    country = pytz.country_names.get(country_code, "Unknown")
-                    countries.append(country)
-            if not countries:
-                countries.append("Unknown")
-            grouped_timezones[region][tz] = countries
-    except Exception as e:
-        print(f"Error grouping timezones: {e}")
-    return grouped_timezones
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"[+-]?[0-9]+|[a-z]+", text))
+
+def get_search_grams(text: str) -> set:
+    """Return the n-grams of a normalized text, padded so word starts and ends are grams too."""
+    padded = f" {text} "
+    return {padded[i:i + SEARCH_GRAM_SIZE] for i in range(len(padded) - SEARCH_GRAM_SIZE + 1)}
+
+class TimezoneSearch:
+    """
+    Ranked fuzzy search over timezone IDs, their city names, the countries observing them
+    and their abbreviations (e.g. CET, EST), through an n-gram index built once.
+    """
+    def __init__(self, grouped_timezones: dict):
+        # (normalized text, timezone, kind) per term, and how many n-grams each term has
+        self.terms = []
+        self.term_gram_counts = []
+        # n-gram -> ids of the terms containing it
+        self.postings = {}
+        # Word prefixes shorter than an n-gram -> ids of the terms with such a word
+        self.prefixes = {}
+        # Ranked results of short queries, which match many terms and repeat at every first keystroke
+        self.short_results = {}
+        year = datetime.datetime.now().year
+        for tz_dict in grouped_timezones.values():
+            for tz, countries in tz_dict.items():
+                terms = {}
+                for kind, text in self.get_terms(tz, countries, year):
+                    text = normalize_search_text(text)
+                    if text and SEARCH_KIND_WEIGHTS[kind] > SEARCH_KIND_WEIGHTS.get(terms.get(text), 0):
+                        terms[text] = kind
+                for text, kind in terms.items():
+                    self.add_term(text, tz, kind)
+
+    @staticmethod
+    def get_terms(tz: str, countries: list, year: int):
+        """Yield (kind, text) for everything a timezone can be found by."""
+        yield "zone", tz
+        parts = tz.split("/")
+        for city in parts[1:] or parts:
+            yield "city", city
+        for country in countries:
+            if country != "Unknown":
+                yield "country", country
+        try:
+            # From the same pytz tables as the clocks, so no second tz database is needed
+            table = TRANSITION_CACHE.get_table(tz)
+            for month in (1, 7):
+                epoch = datetime.datetime(year, month, 1, tzinfo=datetime.timezone.utc).timestamp()
+                abbreviation = table.state_at(epoch).name
+                # Names like '-03' are only offsets, not abbreviations anyone searches for
+                if abbreviation and abbreviation.isalpha():
+                    yield "abbreviation", abbreviation
+        except Exception as e:
+            print(f"Error reading abbreviations of {tz}: {e}")
+
+    def add_term(self, text: str, tz: str, kind: str):
+        """Add one normalized term of a timezone to the index."""
+        term_id = len(self.terms)
+        self.terms.append((text, tz, kind))
+        grams = get_search_grams(text)
+        self.term_gram_counts.append(len(grams))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(term_id)
+        for word in text.split():
+            for length in range(1, SEARCH_GRAM_SIZE):
+                self.prefixes.setdefault(word[:length], set()).add(term_id)
+
+    @staticmethod
+    def score_match(query: str, text: str, similarity: float) -> int:
+        """Score (0-100) how well a term matches a query: whole, prefix, word prefix, substring, then fuzzy."""
+        if text == query:
+            return 100
+        if text.startswith(query):
+            return 90
+        if f" {query}" in f" {text}":
+            return 80
+        if query in text:
+            return SEARCH_LITERAL_SCORE
+        if similarity >= SEARCH_MIN_SIMILARITY:
+            return round((SEARCH_LITERAL_SCORE - 5) * similarity)
+        return 0
+
+    def search(self, query: str, limit: int = None) -> list:
+        """
+        Return (timezone, score) pairs matching the query, best first.
+        Each timezone is scored by its best matching term.
+        """
+        query = normalize_search_text(query)
+        if not query:
+            return []
+        if len(query) < SEARCH_GRAM_SIZE:
+            if query not in self.short_results:
+                candidates = {term_id: 0 for term_id in self.prefixes.get(query, ())}
+                self.short_results[query] = self.rank(query, candidates, 0)
+            return self.short_results[query][:limit]
+        grams = get_search_grams(query)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.postings.get(gram, ()))
+        query_grams = len(grams)
+        # Terms containing the query share all its unpadded n-grams; fuzzy matches
+        # need enough shared n-grams to reach SEARCH_MIN_SIMILARITY
+        needed = min(len(query) - SEARCH_GRAM_SIZE + 1,
+                     SEARCH_MIN_SIMILARITY * query_grams / (2 - SEARCH_MIN_SIMILARITY))
+        candidates = {term_id: shared for term_id, shared in counts.items() if shared >= needed}
+        return self.rank(query, candidates, query_grams)[:limit]
+
+    def rank(self, query: str, candidates: dict, query_grams: int) -> list:
+        """Score candidate terms (id -> shared n-grams) and rank their timezones by their best term."""
+        best = {}
+        for term_id, shared in candidates.items():
+            text, tz, kind = self.terms[term_id]
+            similarity = 2 * shared / (query_grams + self.term_gram_counts[term_id])
+            score = self.score_match(query, text, similarity)
+            if score and (score, SEARCH_KIND_WEIGHTS[kind]) > best.get(tz, (0, 0)):
+                best[tz] = (score, SEARCH_KIND_WEIGHTS[kind])
+        ranked = sorted(best, key=lambda tz: (-best[tz][0], -best[tz][1], tz))
+        if ranked and best[ranked[0]][0] >= SEARCH_LITERAL_SCORE:
+            ranked = [tz for tz in ranked if best[tz][0] >= SEARCH_LITERAL_SCORE]
+        return [(tz, best[tz][0]) for tz in ranked]
+
+# ------------------ CLOCK SCHEDULER ------------------ #
+
+# Milliseconds past each second boundary at which clocks tick, so the new second has surely begun
+TICK_SLACK_MS = 5
+# Milliseconds the search box must be idle before the Treeview is filtered
+SEARCH_DEBOUNCE_MS = 150
+
+class ClockScheduler:
+    """
+    Drives every open clock from a single Tk `after` loop instead of one thread per clock.
+    Ticks are aligned to the wall-clock second, so all clocks change second together.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.clocks = []
+        self.after_id = None
+
+    def register(self, clock):
+        """Add a clock, draw it right away and start ticking if it is the first one."""
+        if clock in self.clocks:
+            return
+        self.clocks.append(clock)
+        self.update(clock, datetime.datetime.now(datetime.timezone.utc))
+        if self.after_id is None:
+            self.schedule()
+
+    def unregister(self, clock):
+        """Remove a clock, and stop ticking once no clock is left."""
+        if clock in self.clocks:
+            self.clocks.remove(clock)
+        if not self.clocks and self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def schedule(self):
+        """Schedule the next tick just after the next wall-clock second boundary."""
+        ms_into_second = int(time.time() * 1000) % 1000
+        self.after_id = self.root.after((1000 - ms_into_second) % 1000 + TICK_SLACK_MS, self.tick)
+
+    def tick(self):
+        """Update every registered clock with the same current time."""
+        self.after_id = None
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for clock in list(self.clocks):
+            self.update(clock, now)
+        if self.clocks:
+            self.schedule()
+
+    @staticmethod
+    def update(clock, now: datetime.datetime):
+        """Update one clock, keeping the others ticking if it fails."""
+        try:
+            clock.update_clock(now)
+        except Exception as e:
+            print(f"Error ticking {type(clock).__name__}: {e}")
+            traceback.print_exc()
+
+def get_clock_scheduler(widget) -> ClockScheduler:
+    """Return the scheduler shared by all clocks of the widget's application, creating it on first use."""
+    root = widget._root()
+    if not hasattr(root, "clock_scheduler"):
+        root.clock_scheduler = ClockScheduler(root)
+    return root.clock_scheduler
 
 # ------------------ DIGITAL CLOCK ------------------ #
 
@@ -153,13 +339,26 @@ class DigitalClock(tk.Frame):
         self.info_label = tk.Label(self, font=("Helvetica", 12))
         self.info_label.pack(fill=tk.X)
 
-        # Start update thread
-        self.stop_threads = False
-        self.update_thread = threading.Thread(target=self.update_clock, daemon=True)
-        self.update_thread.start()
+        # Zone state and date the info label was last written for
+        self.zone_state = None
+        self.shown_date = None
+
+        # Tick with the other clocks until this one is destroyed
+        self.scheduler = get_clock_scheduler(self)
+        self.bind("<Destroy>", self.on_destroy)
 
         # Apply theme
         self.apply_theme()
+        self.scheduler.register(self)
+
+    def on_destroy(self, event):
+        """Stop ticking once the clock's widget is destroyed."""
+        if event.widget is self:
+            self.stop()
+
+    def stop(self):
+        """Deregister the clock from the shared scheduler."""
+        self.scheduler.unregister(self)
 
     def apply_theme(self):
         """Apply dark or light theme to the digital clock."""
@@ -169,27 +368,25 @@ class DigitalClock(tk.Frame):
         self.time_label.configure(bg=bg_color, fg=fg_color)
         self.info_label.configure(bg=bg_color, fg=fg_color)
 
-    def update_clock(self):
-        """Continuously updates the digital clock."""
-        while not self.stop_threads:
-            try:
-                now = datetime.datetime.now(self.timezone)
-                current_time = now.strftime("%H:%M:%S")
-                offset_hrs = now.utcoffset().total_seconds() / 3600 if now.utcoffset() else 0
-                offset_label = f"{get_localized_text('utc_offset')}: UTC{offset_hrs:+.1f}"
-                dst_label = f"{get_localized_text('dst')}: {'Yes' if now.dst() else 'No'}"
-                date_label = f"{get_localized_text('date')}: {now.strftime('%Y-%m-%d')}"
-                info_text = f"{offset_label} | {dst_label} | {date_label}"
-
-                def update_ui():
-                    self.time_label.config(text=current_time)
-                    self.info_label.config(text=info_text)
-
-                self.time_label.after(0, update_ui)
-            except Exception as e:
-                print(f"Error updating digital clock: {e}")
-                traceback.print_exc()
-            time.sleep(1)
+    def update_clock(self, now_utc: datetime.datetime):
+        """Updates the digital clock; called by the scheduler every second."""
+        try:
+            now, state = get_local_time(self.timezone.key, now_utc)
+            self.time_label.config(text=now.strftime("%H:%M:%S"))
+            # The offset and DST only change at a transition, the date at midnight
+            if state is self.zone_state and now.date() == self.shown_date:
+                return
+            self.zone_state = state
+            self.shown_date = now.date()
+            offset_hrs = state.offset / 3600
+            offset_label = f"{get_localized_text('utc_offset')}: UTC{offset_hrs:+.1f}"
+            dst_label = f"{get_localized_text('dst')}: {'Yes' if state.dst else 'No'}"
+            date_label = f"{get_localized_text('date')}: {now.strftime('%Y-%m-%d')}"
+            info_text = f"{offset_label} | {dst_label} | {date_label}"
+            self.info_label.config(text=info_text)
+        except Exception as e:
+            print(f"Error updating digital clock: {e}")
+            traceback.print_exc()
 
 # ------------------ ANALOG CLOCK ------------------ #
 
@@ -218,13 +415,22 @@ class AnalogClock(tk.Frame):
 
         self.draw_clock_face()
 
-        # Start update thread
-        self.stop_threads = False
-        self.update_thread = threading.Thread(target=self.update_clock, daemon=True)
-        self.update_thread.start()
+        # Tick with the other clocks until this one is destroyed
+        self.scheduler = get_clock_scheduler(self)
+        self.bind("<Destroy>", self.on_destroy)
 
         # Apply theme
         self.apply_theme()
+        self.scheduler.register(self)
+
+    def on_destroy(self, event):
+        """Stop ticking once the clock's widget is destroyed."""
+        if event.widget is self:
+            self.stop()
+
+    def stop(self):
+        """Deregister the clock from the shared scheduler."""
+        self.scheduler.unregister(self)
 
     def apply_theme(self):
         """Apply dark or light theme to the analog clock."""
@@ -234,11 +440,12 @@ class AnalogClock(tk.Frame):
         # Update existing items
         for item in self.canvas.find_all():
             tags = self.canvas.gettags(item)
-            if "hands" in tags or "hour_marks" in tags:
-                self.canvas.itemconfig(item, fill=fg_color, outline=fg_color)
+            # The minute and second hands keep their own colors
+            if "hour_hand" in tags or "hour_marks" in tags:
+                self.canvas.itemconfig(item, fill=fg_color)
 
     def draw_clock_face(self):
-        """Draw the static parts of the analog clock."""
+        """Draw the static parts of the analog clock and create its hands."""
         try:
             # Outer circle
             self.canvas.create_oval(
@@ -251,57 +458,45 @@ class AnalogClock(tk.Frame):
                 angle = math.pi / 6 * (hour - 3)
                 x = self.center_x + self.radius * 0.85 * math.cos(angle)
                 y = self.center_y + self.radius * 0.85 * math.sin(angle)
-                self.canvas.create_text(x, y, text=str(hour), font=("Helvetica", 14, "bold"), fill="black")
+                self.canvas.create_text(x, y, text=str(hour), font=("Helvetica", 14, "bold"), fill="black", tags="hour_marks")
+            # Hands are created once and only moved afterwards
+            self.hour_hand = self.canvas.create_line(0, 0, 0, 0, width=6, fill="black", tags=("hands", "hour_hand"))
+            self.minute_hand = self.canvas.create_line(0, 0, 0, 0, width=4, fill="blue", tags="hands")
+            self.second_hand = self.canvas.create_line(0, 0, 0, 0, width=2, fill="red", tags="hands")
+            self.hand_angles = {}
         except Exception as e:
             print(f"Error drawing analog clock face: {e}")
             traceback.print_exc()
 
-    def update_clock(self):
-        """Continuously updates the analog clock."""
-        while not self.stop_threads:
-            try:
-                now = datetime.datetime.now(self.timezone)
-                hours = now.hour % 12
-                minutes = now.minute
-                seconds = now.second
-
-                # Calculate angles
-                sec_angle = math.pi / 30 * seconds - math.pi / 2
-                min_angle = math.pi / 30 * minutes + (math.pi / 1800) * seconds - math.pi / 2
-                hour_angle = math.pi / 6 * hours + (math.pi / 360) * minutes - math.pi / 2
-
-                def draw_hands():
-                    self.canvas.delete("hands")
-                    # Hour hand
-                    hour_length = self.radius * 0.5
-                    hour_x = self.center_x + hour_length * math.cos(hour_angle)
-                    hour_y = self.center_y + hour_length * math.sin(hour_angle)
-                    self.canvas.create_line(
-                        self.center_x, self.center_y, hour_x, hour_y,
-                        width=6, fill="black", tags="hands"
-                    )
-                    # Minute hand
-                    min_length = self.radius * 0.75
-                    min_x = self.center_x + min_length * math.cos(min_angle)
-                    min_y = self.center_y + min_length * math.sin(min_angle)
-                    self.canvas.create_line(
-                        self.center_x, self.center_y, min_x, min_y,
-                        width=4, fill="blue", tags="hands"
-                    )
-                    # Second hand
-                    sec_length = self.radius * 0.9
-                    sec_x = self.center_x + sec_length * math.cos(sec_angle)
-                    sec_y = self.center_y + sec_length * math.sin(sec_angle)
-                    self.canvas.create_line(
-                        self.center_x, self.center_y, sec_x, sec_y,
-                        width=2, fill="red", tags="hands"
-                    )
-
-                self.canvas.after(0, draw_hands)
-            except Exception as e:
-                print(f"Error updating analog clock: {e}")
-                traceback.print_exc()
-            time.sleep(1)
+    def update_clock(self, now_utc: datetime.datetime):
+        """Updates the analog clock; called by the scheduler every second."""
+        try:
+            now, _ = get_local_time(self.timezone.key, now_utc)
+            hours = now.hour % 12
+            minutes = now.minute
+            seconds = now.second
+
+            # Calculate angles
+            sec_angle = math.pi / 30 * seconds - math.pi / 2
+            min_angle = math.pi / 30 * minutes + (math.pi / 1800) * seconds - math.pi / 2
+            hour_angle = math.pi / 6 * hours + (math.pi / 360) * minutes - math.pi / 2
+
+            # The hour hand only moves once a minute, so most ticks leave it alone
+            self.move_hand(self.hour_hand, hour_angle, self.radius * 0.5)
+            self.move_hand(self.minute_hand, min_angle, self.radius * 0.75)
+            self.move_hand(self.second_hand, sec_angle, self.radius * 0.9)
+        except Exception as e:
+            print(f"Error updating analog clock: {e}")
+            traceback.print_exc()
+
+    def move_hand(self, hand: int, angle: float, length: float):
+        """Point a hand at an angle, unless it already points there."""
+        if self.hand_angles.get(hand) == angle:
+            return
+        self.hand_angles[hand] = angle
+        end_x = self.center_x + length * math.cos(angle)
+        end_y = self.center_y + length * math.sin(angle)
+        self.canvas.coords(hand, self.center_x, self.center_y, end_x, end_y)
 
 # ------------------ EARTH CLOCK ------------------ #
 
@@ -329,19 +524,30 @@ class EarthClock(tk.Frame):
         self.radius = 250
 
         self.rotation_angle = 0
+        # Zone state the timezone line was last drawn for
+        self.zone_state = None
 
         self.draw_earth()
 
-        # Start update thread
-        self.stop_threads = False
-        self.update_thread = threading.Thread(target=self.update_earth_clock, daemon=True)
-        self.update_thread.start()
+        # Tick with the other clocks until this one is destroyed
+        self.scheduler = get_clock_scheduler(self)
+        self.bind("<Destroy>", self.on_destroy)
 
         # Bind click on Earth canvas
         self.canvas.bind("<Button-1>", self.on_earth_click)
 
         # Apply theme
         self.apply_theme()
+        self.scheduler.register(self)
+
+    def on_destroy(self, event):
+        """Stop ticking once the clock's widget is destroyed."""
+        if event.widget is self:
+            self.stop()
+
+    def stop(self):
+        """Deregister the clock from the shared scheduler."""
+        self.scheduler.unregister(self)
 
     def apply_theme(self):
         """Apply dark or light theme to the Earth clock."""
@@ -446,35 +652,37 @@ class EarthClock(tk.Frame):
             traceback.print_exc()
             return []
 
-    def update_earth_clock(self):
+    def update_clock(self, now_utc: datetime.datetime):
         """
         Update the Earth clock visuals:
         - Update terminator
         - Update timezone line based on selected timezone
         """
-        while not self.stop_threads:
-            try:
-                now = datetime.datetime.now(self.timezone)
-                # Calculate UTC offset in hours
-                offset_hrs = now.utcoffset().total_seconds() / 3600 if now.utcoffset() else 0
-                # Each hour represents 15 degrees longitude
-                longitude = offset_hrs * 15
-
-                # Calculate angle for timezone line
-                angle = math.radians(longitude - 90)  # Adjust so 0 radians is at top
-
-                # Update terminator
-                terminator_coords = self.calculate_terminator_polygon()
-                self.canvas.coords(self.terminator, terminator_coords)
-
-                # Update timezone line
-                end_x = self.center_x + self.radius * math.cos(angle)
-                end_y = self.center_y + self.radius * math.sin(angle)
-                self.canvas.coords(self.timezone_line, self.center_x, self.center_y, end_x, end_y)
-            except Exception as e:
-                print(f"Error updating Earth clock: {e}")
-                traceback.print_exc()
-            time.sleep(1)
+        try:
+            # Update terminator
+            terminator_coords = self.calculate_terminator_polygon()
+            self.canvas.coords(self.terminator, terminator_coords)
+
+            # The timezone line only moves when the zone crosses a transition
+            state = TRANSITION_CACHE.get_state(self.timezone.key, now_utc.timestamp())
+            if state is self.zone_state:
+                return
+            self.zone_state = state
+            # Calculate UTC offset in hours
+            offset_hrs = state.offset / 3600
+            # Each hour represents 15 degrees longitude
+            longitude = offset_hrs * 15
+
+            # Calculate angle for timezone line
+            angle = math.radians(longitude - 90)  # Adjust so 0 radians is at top
+
+            # Update timezone line
+            end_x = self.center_x + self.radius * math.cos(angle)
+            end_y = self.center_y + self.radius * math.sin(angle)
+            self.canvas.coords(self.timezone_line, self.center_x, self.center_y, end_x, end_y)
+        except Exception as e:
+            print(f"Error updating Earth clock: {e}")
+            traceback.print_exc()
 
     def on_earth_click(self, event):
         """Handle click on Earth canvas by showing approximate longitude."""
@@ -567,14 +775,11 @@ class MultiClockWindow(tk.Toplevel):
             traceback.print_exc()
 
     def on_close(self):
-        """Handle closing the window and stopping threads."""
+        """Handle closing the window and deregistering its clocks."""
         try:
-            if hasattr(self, 'digital_clock') and hasattr(self.digital_clock, 'stop_threads'):
-                self.digital_clock.stop_threads = True
-            if hasattr(self, 'analog_clock') and hasattr(self.analog_clock, 'stop_threads'):
-                self.analog_clock.stop_threads = True
-            if hasattr(self, 'earth_clock') and hasattr(self.earth_clock, 'stop_threads'):
-                self.earth_clock.stop_threads = True
+            for name in ('digital_clock', 'analog_clock', 'earth_clock'):
+                if hasattr(self, name):
+                    getattr(self, name).stop()
             self.destroy()
         except Exception as e:
             print(f"Error closing MultiClockWindow: {e}")
@@ -599,6 +804,9 @@ class TimezoneApp(tk.Tk):
 
         # Load grouped timezones
         self.grouped_timezones = get_timezones_grouped()
+        self.timezone_index = build_timezone_index(self.grouped_timezones)
+        self.timezone_search = TimezoneSearch(self.grouped_timezones)
+        self.filter_after_id = None
 
         # Create UI
         self.create_widgets()
@@ -716,41 +924,69 @@ class TimezoneApp(tk.Tk):
             print(f"Error creating widgets: {e}")
             traceback.print_exc()
 
-    def populate_treeview(self, filter_text=""):
-        """Populates the Treeview with regions/timezones."""
+    def populate_treeview(self):
+        """Inserts every region/timezone into the Treeview once; filtering only hides and shows them."""
         try:
-            # Clear existing entries
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-
-            # Iterate through regions
-            for region, tz_dict in sorted(self.grouped_timezones.items()):
-                # Filter timezones that match search
-                matching_timezones = {
-                    tz: countries 
-                    for tz, countries in tz_dict.items() 
-                    if filter_text.lower() in tz.lower()
-                }
-                if matching_timezones:
-                    region_id = self.tree.insert("", "end", text=region, open=False)
-                    for tz, countries in sorted(matching_timezones.items()):
-                        country_list = ", ".join(sorted(set(countries)))
-                        self.tree.insert(region_id, "end", iid=tz, text=tz, values=(country_list,))
+            self.region_items = {}
+            self.visible_children = {}
+            for region, entries in self.timezone_index.items():
+                region_id = self.tree.insert("", "end", text=region, open=False)
+                for tz, country_list in entries:
+                    self.tree.insert(region_id, "end", iid=tz, text=tz, values=(country_list,))
+                self.region_items[region] = region_id
+                self.visible_children[region] = [tz for tz, _ in entries]
         except Exception as e:
             messagebox.showerror(get_localized_text("error_title"), f"Failed to populate Treeview: {e}")
             print(f"Error populating Treeview: {e}")
             traceback.print_exc()
 
+    def filter_treeview(self, filter_text=""):
+        """Shows only the timezones matching the filter text, best matches first."""
+        try:
+            ranks = None
+            if filter_text.strip():
+                ranks = {tz: rank for rank, (tz, _) in enumerate(self.timezone_search.search(filter_text))}
+            visible_regions = []
+            for region, entries in self.timezone_index.items():
+                if ranks is None:
+                    children = [tz for tz, _ in entries]
+                else:
+                    children = sorted((tz for tz, _ in entries if tz in ranks), key=ranks.get)
+                # Detached items keep their data, so showing them again is just a move
+                if children != self.visible_children[region]:
+                    self.tree.set_children(self.region_items[region], *children)
+                    self.visible_children[region] = children
+                if children:
+                    visible_regions.append(region)
+            if ranks is not None:
+                # Regions in the order of their best match
+                visible_regions.sort(key=lambda region: ranks[self.visible_children[region][0]])
+            self.tree.set_children("", *(self.region_items[region] for region in visible_regions))
+            if ranks:
+                self.tree.see(self.visible_children[visible_regions[0]][0])
+        except Exception as e:
+            messagebox.showerror(get_localized_text("error_title"), f"Failed to filter Treeview: {e}")
+            print(f"Error filtering Treeview: {e}")
+            traceback.print_exc()
+
     def update_filter(self, *args):
-        """Update the Treeview based on search input."""
+        """Filter the Treeview once the search input has stopped changing for a moment."""
         try:
-            text = self.search_var.get()
-            self.populate_treeview(text)
+            if self.filter_after_id is not None:
+                self.after_cancel(self.filter_after_id)
+            self.filter_after_id = self.after(SEARCH_DEBOUNCE_MS, self.apply_filter)
         except Exception as e:
             messagebox.showerror(get_localized_text("error_title"), f"Failed to update filter: {e}")
             print(f"Error updating filter: {e}")
             traceback.print_exc()
 
+    def apply_filter(self):
+        """Filter the Treeview with the current search input right away."""
+        if self.filter_after_id is not None:
+            self.after_cancel(self.filter_after_id)
+            self.filter_after_id = None
+        self.filter_treeview(self.search_var.get())
+
     # ------------------ FAVORITES & SESSION ------------------ #
 
     def get_selected_timezone(self) -> str:
@@ -791,8 +1027,12 @@ class TimezoneApp(tk.Tk):
         try:
             fav = self.session.get("favorite_timezone", None)
             if fav:
-                # Try to select it in the tree
+                # Try to select it in the tree, clearing a search that hides it
                 if self.tree.exists(fav):
+                    # A timezone hidden by the filter is detached, so it has no parent
+                    if not self.tree.parent(fav) and self.search_var.get():
+                        self.search_var.set("")
+                        self.apply_filter()
                     self.tree.selection_set(fav)
                     self.tree.see(fav)
                     messagebox.showinfo(get_localized_text("info_title"), get_localized_text("load_favorite_success"))
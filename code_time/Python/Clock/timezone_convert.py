@@ -0,0 +1,247 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+import pytz
+from timezones import TRANSITION_CACHE
+
+# Bulk conversion of UTC epoch timestamps into local times of many zones, without any GUI.
+# Each zone's transition table is turned into NumPy arrays once; converting an array of
+# timestamps is then one searchsorted for the period each falls in and one gather of its
+# offset, so millions of timestamps convert in a fraction of a second per zone.
+# Like pytz itself, the tables end in 2037: later times keep the offset in force then.
+
+# ------------------ CONVERSION ENGINE ------------------ #
+
+# Epoch units accepted, as units per second
+EPOCH_UNITS = {"s": 1, "ms": 10 ** 3, "us": 10 ** 6, "ns": 10 ** 9}
+
+def format_offset(offset: int) -> str:
+    """Format a UTC offset in seconds as an ISO 8601 suffix like +05:30."""
+    sign = "-" if offset < 0 else "+"
+    hours, rest = divmod(abs(offset), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}" + (f":{seconds:02d}" if seconds else "")
+
+def to_epoch_array(epochs) -> np.ndarray:
+    """Return epoch values as an int64 array, flooring fractions of the unit."""
+    epochs = np.asarray(epochs)
+    if epochs.dtype.kind == "f":
+        return np.floor(epochs).astype(np.int64)
+    return epochs.astype(np.int64, copy=False)
+
+class LocalTimes(NamedTuple):
+    """Local times of an array of instants in one zone."""
+    # Wall-clock times as datetime64 in the epoch unit
+    local: np.ndarray
+    # UTC offsets and DST in seconds
+    offset: np.ndarray
+    dst: np.ndarray
+    abbreviation: np.ndarray
+
+class ZoneConverter:
+    """
+    Converts arrays of UTC epoch values to local times of one zone,
+    through its transition table held as NumPy arrays.
+    """
+    def __init__(self, timezone_str: str, unit: str = "s"):
+        table = TRANSITION_CACHE.get_table(timezone_str)
+        self.timezone_str = timezone_str
+        self.unit = unit
+        self.scale = EPOCH_UNITS[unit]
+        # Transition instants in the epoch unit; period i + 1 starts at transitions[i]
+        self.transitions = np.array(table.times[1:], dtype=np.int64) * self.scale
+        self.offsets = np.array(table.offsets, dtype=np.int64)
+        self.dsts = np.array(table.dsts, dtype=np.int64)
+        self.names = np.array(table.names, dtype=object)
+        self.suffixes = np.array([format_offset(offset) for offset in table.offsets])
+
+    def periods(self, epochs: np.ndarray) -> np.ndarray:
+        """Return the index of the period (offset) in force at each epoch value."""
+        return np.searchsorted(self.transitions, epochs, side="right")
+
+    def local_times(self, epochs: np.ndarray, periods: np.ndarray) -> np.ndarray:
+        """Return wall-clock times as datetime64 in the epoch unit."""
+        return (epochs + self.offsets[periods] * self.scale).astype(f"datetime64[{self.unit}]")
+
+    def convert(self, epochs) -> LocalTimes:
+        """Convert UTC epoch values to local times with their offset, DST and abbreviation."""
+        epochs = to_epoch_array(epochs)
+        periods = self.periods(epochs)
+        return LocalTimes(self.local_times(epochs, periods), self.offsets[periods], self.dsts[periods], self.names[periods])
+
+    def isoformat(self, epochs) -> np.ndarray:
+        """Convert UTC epoch values to ISO 8601 local times with their offset, e.g. 2026-03-29T03:00:00+02:00."""
+        epochs = to_epoch_array(epochs)
+        periods = self.periods(epochs)
+        return np.char.add(np.datetime_as_string(self.local_times(epochs, periods)), self.suffixes[periods])
+
+class BulkConverter:
+    """Converts the same arrays of UTC epoch values into several zones at once."""
+    def __init__(self, timezones: list, unit: str = "s"):
+        self.converters = {timezone_str: ZoneConverter(timezone_str, unit) for timezone_str in timezones}
+
+    def convert(self, epochs) -> dict:
+        """Return {timezone: LocalTimes} for UTC epoch values."""
+        epochs = to_epoch_array(epochs)
+        return {timezone_str: converter.convert(epochs) for timezone_str, converter in self.converters.items()}
+
+    def isoformat(self, epochs) -> dict:
+        """Return {timezone: array of ISO 8601 local times} for UTC epoch values."""
+        epochs = to_epoch_array(epochs)
+        return {timezone_str: converter.isoformat(epochs) for timezone_str, converter in self.converters.items()}
+
+def convert_epochs(epochs, timezones: list, unit: str = "s") -> dict:
+    """Convert UTC epoch values into local times of several zones; returns {timezone: LocalTimes}."""
+    return BulkConverter(timezones, unit).convert(epochs)
+
+# ------------------ STREAMING FILES ------------------ #
+
+def get_file_format(path: str) -> str:
+    """Guess 'jsonl' or 'csv' from a file name."""
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+# Writes JSONL records compactly, like pandas' to_json
+RECORD_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+def read_records(source, chunksize: int):
+    """Yield lists of up to chunksize JSONL records, parsed with json.loads so integers stay exact."""
+    lines = []
+    for line in source:
+        if line.strip():
+            lines.append(line)
+            if len(lines) == chunksize:
+                yield json.loads("[" + ",".join(lines) + "]")
+                lines = []
+    if lines:
+        yield json.loads("[" + ",".join(lines) + "]")
+
+def read_chunks(input_file: str, file_format: str, chunksize: int):
+    """Yield DataFrames (CSV) or lists of records (JSONL) of up to chunksize records, keeping every value as read."""
+    if file_format == "csv":
+        yield from pd.read_csv(sys.stdin if input_file == "-" else input_file, chunksize=chunksize,
+                               dtype=str, keep_default_na=False)
+    elif input_file == "-":
+        yield from read_records(sys.stdin, chunksize)
+    else:
+        with open(input_file, encoding="utf-8") as source:
+            yield from read_records(source, chunksize)
+
+def parse_epochs(values) -> tuple:
+    """
+    Return (epochs, valid): the epoch values among numbers or numeric strings as an int64 array,
+    floored like to_epoch_array, and the mask of the values that are numeric.
+    """
+    epochs = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce", dtype_backend="numpy_nullable")
+    if pd.api.types.is_integer_dtype(epochs):
+        valid = ~epochs.isna().to_numpy()
+        return epochs.to_numpy(dtype=np.int64, na_value=0), valid
+    # The values went through float64, which rounds integers above 2**53 such as
+    # nanosecond timestamps: convert each one from its Python value instead
+    epochs = np.zeros(len(values), dtype=np.int64)
+    valid = np.zeros(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        if isinstance(value, str):
+            try:
+                value = int(value)
+            except ValueError:
+                try:
+                    value = float(value)
+                except ValueError:
+                    continue
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                continue
+            value = math.floor(value)
+        if isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63:
+            epochs[i] = value
+            valid[i] = True
+    return epochs, valid
+
+def local_time_columns(values, converter: BulkConverter) -> dict:
+    """Return {timezone: ISO 8601 local times} for epoch values, None where a value is not numeric."""
+    epochs, valid = parse_epochs(values)
+    columns = {}
+    for timezone_str, local_times in converter.isoformat(epochs[valid]).items():
+        columns[timezone_str] = np.full(len(valid), None, dtype=object)
+        columns[timezone_str][valid] = local_times
+    return columns
+
+def add_local_times(chunk, column: str, converter: BulkConverter):
+    """Add a column (CSV) or field (JSONL) of ISO 8601 local times per zone; records without a numeric timestamp get none."""
+    if isinstance(chunk, pd.DataFrame):
+        for timezone_str, local_times in local_time_columns(chunk[column].tolist(), converter).items():
+            chunk[timezone_str] = local_times
+        return chunk
+    columns = local_time_columns([record.get(column) for record in chunk], converter)
+    for i, record in enumerate(chunk):
+        record.update((timezone_str, local_times[i]) for timezone_str, local_times in columns.items())
+    return chunk
+
+def write_chunk(chunk, output, file_format: str, first: bool):
+    """Write one converted chunk, with the CSV header only before the first one."""
+    if file_format == "jsonl":
+        # Records are written as parsed, so every original field comes back unchanged
+        output.writelines(RECORD_ENCODER.encode(record) + "\n" for record in chunk)
+    else:
+        chunk.to_csv(output, header=first, index=False, lineterminator="\n")
+
+def convert_file(input_file: str, output, timezones: list, column: str = "timestamp", unit: str = "s",
+                 file_format: str = "csv", chunksize: int = 100000) -> int:
+    """Stream a CSV/JSONL file of UTC epoch timestamps, adding local times per zone; returns the records written."""
+    converter = BulkConverter(timezones, unit)
+    records = 0
+    for chunk in read_chunks(input_file, file_format, chunksize):
+        found = column in chunk.columns if file_format == "csv" else any(column in record for record in chunk)
+        if not found:
+            raise KeyError(f"Column '{column}' not found in {input_file}")
+        write_chunk(add_local_times(chunk, column, converter), output, file_format, records == 0)
+        records += len(chunk)
+    return records
+
+# ------------------ ENTRY POINT ------------------ #
+
+def main(argv=None) -> int:
+    """Convert the timestamps of a CSV/JSONL file from the command line; returns the exit status."""
+    parser = argparse.ArgumentParser(description="Add local times in several timezones to a CSV/JSONL file of UTC epoch timestamps.")
+    parser.add_argument("input_file", nargs="?", default="-", help="CSV or JSONL file, or - for stdin (default: %(default)s)")
+    parser.add_argument("-z", "--zone", action="append", dest="zones", required=True,
+                        help="timezone to convert to, e.g. Europe/Oslo (can be given more than once)")
+    parser.add_argument("-c", "--column", default="timestamp", help="column of UTC epoch values (default: %(default)s)")
+    parser.add_argument("--unit", choices=list(EPOCH_UNITS), default="s", help="unit of the epoch values (default: %(default)s)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None, dest="file_format",
+                        help="file format (default: from the input file name, else csv)")
+    parser.add_argument("--chunksize", type=int, default=100000, help="records converted at a time (default: %(default)s)")
+    parser.add_argument("-o", "--output", default="-", help="file to write, or - for stdout (default: %(default)s)")
+    args = parser.parse_args(argv)
+    unknown = [zone for zone in args.zones if zone not in pytz.all_timezones_set]
+    if unknown:
+        parser.error(f"unknown timezone(s): {', '.join(unknown)}")
+    if args.chunksize < 1:
+        parser.error("--chunksize must be at least 1")
+    if args.input_file != "-" and not os.path.exists(args.input_file):
+        print(f"Error: The input file '{args.input_file}' does not exist.", file=sys.stderr)
+        return 1
+    file_format = args.file_format or get_file_format(args.input_file)
+
+    start = time.perf_counter()
+    try:
+        if args.output == "-":
+            records = convert_file(args.input_file, sys.stdout, args.zones, args.column, args.unit, file_format, args.chunksize)
+        else:
+            with open(args.output, "w", encoding="utf-8", newline="") as output:
+                records = convert_file(args.input_file, output, args.zones, args.column, args.unit, file_format, args.chunksize)
+    except Exception as e:
+        print(f"Error converting timestamps: {e}", file=sys.stderr)
+        return 1
+    print(f"Converted {records} records into {len(args.zones)} timezone(s) in {time.perf_counter() - start:.2f} s.",
+          file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import datetime
+import bisect
+import json
+import math
+import os
+import time
+from typing import NamedTuple
+import pytz
+
+# Timezone data shared by the clocks and the bulk converter, without any GUI.
+
+# ------------------ TIMEZONE & GROUPING ------------------ #
+
+# Grouped timezones, rebuilt only when pytz ships a new tz database
+TIMEZONE_CACHE_FILE = "timezones_cache.json"
+
+def load_timezone_cache():
+    """Load the grouped timezones from the cache file if it matches the installed tz database."""
+    try:
+        if os.path.exists(TIMEZONE_CACHE_FILE):
+            with open(TIMEZONE_CACHE_FILE, "r", encoding="utf-8") as file:
+                cache = json.load(file)
+            if cache.get("tz_version") == pytz.OLSON_VERSION:
+                return cache.get("grouped")
+    except Exception as e:
+        print(f"Error loading timezone cache: {e}")
+    return None
+
+def save_timezone_cache(grouped_timezones: dict):
+    """Save the grouped timezones to the cache file, keyed on the tz database version."""
+    try:
+        with open(TIMEZONE_CACHE_FILE, "w", encoding="utf-8") as file:
+            json.dump({"tz_version": pytz.OLSON_VERSION, "grouped": grouped_timezones}, file, ensure_ascii=False)
+    except Exception as e:
+        print(f"Error saving timezone cache: {e}")
+
+def get_zone_countries() -> dict:
+    """Map every timezone to the names of the countries that observe it, in one pass over the countries."""
+    zone_countries = {}
+    for country_code, timezones in pytz.country_timezones.items():
+        country = pytz.country_names.get(country_code, "Unknown")
+        for tz in timezones:
+            zone_countries.setdefault(tz, []).append(country)
+    return zone_countries
+
+def get_timezones_grouped(use_cache: bool = True):
+    """
+    Retrieves all timezones, groups them by their region, 
+    and maps them to the countries that observe them.
+    The result is cached on disk until the tz database changes.
+    """
+    if use_cache:
+        cached = load_timezone_cache()
+        if cached:
+            return cached
+    grouped_timezones = {}
+    try:
+        zone_countries = get_zone_countries()
+        for tz in pytz.all_timezones:
+            if '/' in tz:
+                region, city = tz.split('/', 1)
+            else:
+                region = 'Other'
+                city = tz
+            if region not in grouped_timezones:
+                grouped_timezones[region] = {}
+            grouped_timezones[region][tz] = zone_countries.get(tz, ["Unknown"])
+    except Exception as e:
+        print(f"Error grouping timezones: {e}")
+        return grouped_timezones
+    if use_cache:
+        save_timezone_cache(grouped_timezones)
+    return grouped_timezones
+
+# ------------------ TRANSITION CACHE ------------------ #
+
+UTC_EPOCH = datetime.datetime(1970, 1, 1)
+
+class ZoneState(NamedTuple):
+    """The UTC offset and DST (in seconds) and abbreviation a zone keeps from `start` until `end` (UTC epoch seconds)."""
+    offset: int
+    dst: int
+    name: str
+    start: float
+    end: float
+    # Fixed-offset tzinfo for converting times within the state
+    tzinfo: datetime.tzinfo
+
+class TransitionTable:
+    """
+    The UTC instants at which a zone's offset changes, with the offset, DST and abbreviation
+    in force from each one, read once from the pytz database. pytz lists transitions up to 2037.
+    """
+    def __init__(self, timezone_str: str):
+        zone = pytz.timezone(timezone_str)
+        transitions = getattr(zone, "_utc_transition_times", None)
+        if transitions:
+            # The first entry is pytz's placeholder for "since forever"
+            self.times = [-math.inf] + [(when - UTC_EPOCH).total_seconds() for when in transitions[1:]]
+            infos = zone._transition_info
+        else:
+            # Fixed-offset zones like UTC have no transitions
+            self.times = [-math.inf]
+            infos = [(zone.utcoffset(UTC_EPOCH), zone.dst(UTC_EPOCH), zone.tzname(UTC_EPOCH))]
+        self.offsets = [int(offset.total_seconds()) for offset, _, _ in infos]
+        self.dsts = [int(dst.total_seconds()) for _, dst, _ in infos]
+        self.names = [name for _, _, name in infos]
+
+    def state_at(self, epoch: float) -> ZoneState:
+        """Return the state in force at a UTC epoch time, until the next transition."""
+        index = bisect.bisect_right(self.times, epoch) - 1
+        end = self.times[index + 1] if index + 1 < len(self.times) else math.inf
+        tzinfo = datetime.timezone(datetime.timedelta(seconds=self.offsets[index]), self.names[index])
+        return ZoneState(self.offsets[index], self.dsts[index], self.names[index], self.times[index], end, tzinfo)
+
+class TransitionCache:
+    """
+    Transition tables of the zones in use and the state each zone is currently in.
+    A lookup only compares the time with the cached state's bounds until a transition is crossed.
+    """
+    def __init__(self):
+        self.tables = {}
+        self.states = {}
+
+    def get_table(self, timezone_str: str) -> TransitionTable:
+        """Return a zone's transition table, reading it on first use."""
+        table = self.tables.get(timezone_str)
+        if table is None:
+            table = self.tables[timezone_str] = TransitionTable(timezone_str)
+        return table
+
+    def get_state(self, timezone_str: str, epoch: float) -> ZoneState:
+        """Return the state of a zone at a UTC epoch time; the same object until it ends."""
+        state = self.states.get(timezone_str)
+        if state is None or not state.start <= epoch < state.end:
+            state = self.states[timezone_str] = self.get_table(timezone_str).state_at(epoch)
+        return state
+
+    def precompute(self, timezones=None, epoch: float = None):
+        """Compute the current state and next transition of many zones (all of them by default) up front."""
+        epoch = time.time() if epoch is None else epoch
+        for timezone_str in (pytz.all_timezones if timezones is None else timezones):
+            try:
+                self.get_state(timezone_str, epoch)
+            except Exception as e:
+                print(f"Error reading transitions of {timezone_str}: {e}")
+
+# Shared by all clocks, so clocks of the same zone look its transitions up once
+TRANSITION_CACHE = TransitionCache()
+
+def get_local_time(timezone_str: str, now_utc: datetime.datetime):
+    """Return the local time of a zone at an aware UTC time, and the zone's state then."""
+    state = TRANSITION_CACHE.get_state(timezone_str, now_utc.timestamp())
+    return now_utc.astimezone(state.tzinfo), state
@@ -0,0 +1,184 @@
+import numpy as np
+from fuzzywuzzy import fuzz
+
+# -------------------------------
+# Batch Similarity Scoring
+# -------------------------------
+#
+# With python-Levenshtein installed, fuzz.ratio(a, b) is
+# round(100 * 2 * LCS(a, b) / (len(a) + len(b))), LCS being the longest common
+# subsequence. The LCS of many pairs can be computed at once with the
+# bit-parallel algorithm of Allison and Dix: the shorter string of each pair
+# becomes one bitmask per character (split over 64-bit words for long strings),
+# and each character of the longer one is then a handful of NumPy operations
+# over all pairs together. Cheap upper bounds from the lengths and character
+# counts first drop the pairs that cannot reach the score cutoff.
+#
+# The pure-Python difflib fallback of fuzzywuzzy is not LCS based, so without
+# python-Levenshtein pairs are scored one at a time with fuzz.ratio to keep the
+# scores identical.
+
+WORD_BITS = 64
+BATCH_SCORING = fuzz.SequenceMatcher.__module__ != 'difflib'
+
+
+def _compact(ids, size):
+    """
+    Like np.unique(ids, return_inverse=True) for ids in range(size), without sorting.
+
+    :return: (sorted distinct ids, position of each entry among them) tuple.
+    """
+    used = np.zeros(size, dtype=bool)
+    used[ids] = True
+    return np.flatnonzero(used), (np.cumsum(used) - 1)[ids]
+
+
+def _char_codes(strings):
+    """
+    Packs strings into a zero-padded 2D array of character codes, one row per string.
+    The characters in use are numbered from 1 so the bitmasks stay small.
+
+    :return: (codes, lengths, alphabet size) tuple.
+    """
+    lengths = np.array([len(text) for text in strings], dtype=np.int64)
+    # UTF-32 has one fixed-size unit per character, so positions line up with str indexes
+    flat = np.frombuffer("".join(strings).encode('utf-32-le'), dtype=np.uint32)
+    alphabet, flat = _compact(flat, int(flat.max(initial=0)) + 1)
+    rows = np.repeat(np.arange(len(strings)), lengths)
+    columns = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    codes = np.zeros((len(strings), max(1, int(lengths.max(initial=0)))), dtype=np.int64)
+    codes[rows, columns] = flat + 1
+    return codes, lengths, len(alphabet) + 1
+
+
+def _match_masks(codes, alphabet, words):
+    """
+    Per-string, per-character bitmasks, flattened so masks[(i * alphabet + c) * words + w]
+    has bit k set if character 64 * w + k of string i has code c. Padding has code 0 and
+    sets no bits.
+    """
+    count = codes.shape[0]
+    masks = np.zeros((count, alphabet, words), dtype=np.uint64)
+    rows = np.arange(count)
+    # Within one column every string appears once, so the in-place OR is safe
+    for column in range(min(codes.shape[1], words * WORD_BITS)):
+        bit = np.left_shift(np.uint64(1), np.uint64(column % WORD_BITS))
+        masks[rows, codes[:, column], column // WORD_BITS] |= bit
+    masks[:, 0, :] = 0
+    return masks.ravel()
+
+
+def _popcount(values):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).astype(np.int64)
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+    return table[values.view(np.uint8).reshape(values.shape + (8,))].sum(axis=-1)
+
+
+def _lcs_lengths(codes, lengths, longer, shorter, alphabet):
+    """
+    Longest common subsequence length of every (longer, shorter) pair of strings.
+    The shorter string of each pair is held as bitmasks and the longer one is walked
+    a character at a time, all pairs together.
+    """
+    lcs = np.zeros(len(longer), dtype=np.int64)
+    words_needed = np.maximum(1, -(-lengths[shorter] // WORD_BITS))
+    for words in np.unique(words_needed):
+        group = np.flatnonzero(words_needed == words)
+        # Longest walks first, so the pairs still walking are always a prefix
+        group = group[np.argsort(-lengths[longer[group]], kind='stable')]
+        walk_lengths = lengths[longer[group]]
+        # One row per step, so each step reads a contiguous run of characters
+        walk_codes = np.ascontiguousarray(codes[longer[group]].T) * words
+        held, held_rows = np.unique(shorter[group], return_inverse=True)
+        masks = _match_masks(codes[held], alphabet, words)
+        base = held_rows * (alphabet * words)
+        state = np.full((words, len(group)), np.iinfo(np.uint64).max, dtype=np.uint64)
+        steps = int(walk_lengths[0]) if len(group) else 0
+        for step in range(steps):
+            active = np.searchsorted(-walk_lengths, -step)
+            offsets = base[:active] + walk_codes[step, :active]
+            carry = np.zeros(active, dtype=np.uint64)
+            for word in range(words):
+                current = state[word, :active]
+                matched = masks.take(offsets + word) & current
+                # current - matched never borrows, since matched only has bits that current has
+                rest = current ^ matched
+                total = current + matched + carry
+                carry = ((total < current) | ((total == current) & (carry == 1))).astype(np.uint64)
+                current[:] = total | rest
+
+        # Each bit of the shorter string that ended up zero stands for one matched character
+        short_lengths = lengths[shorter[group]]
+        for word in range(words):
+            used = np.clip(short_lengths - word * WORD_BITS, 0, WORD_BITS).astype(np.uint64)
+            low_bits = np.where(
+                used == WORD_BITS,
+                np.iinfo(np.uint64).max,
+                np.left_shift(np.uint64(1), used % np.uint64(WORD_BITS)) - np.uint64(1),
+            )
+            lcs[group] += _popcount(~state[word] & low_bits)
+    return lcs
+
+
+def _ratio(common, len_a, len_b):
+    """fuzz.ratio score of pairs with this many characters in common."""
+    total = len_a + len_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Same float steps as Levenshtein.ratio, so halves round the same way
+        ratio = np.rint(100 * (1 - (total - 2 * common) / total))
+    # fuzz.ratio gives 100 for equal strings (even empty ones) and 0 if only one is empty
+    ratio = np.where((len_a == 0) | (len_b == 0), 0, ratio)
+    ratio = np.where(total == 0, 100, ratio)
+    return ratio.astype(np.int64)
+
+
+def score_pairs(queries, choices, query_ids, choice_ids, score_cutoff=0):
+    """
+    Scores many (query, choice) pairs in one batch, exactly as fuzz.ratio would.
+
+    :param queries: List of query strings.
+    :param choices: List of choice strings.
+    :param query_ids: Sequence of indexes into queries, one per pair.
+    :param choice_ids: Sequence of indexes into choices, one per pair.
+    :param score_cutoff: Scores below this are only guaranteed to be below it, which
+                         lets pairs that clearly cannot reach it skip the full scoring.
+    :return: NumPy int array of scores (0-100), one per pair.
+    """
+    query_ids = np.asarray(query_ids, dtype=np.int64)
+    choice_ids = np.asarray(choice_ids, dtype=np.int64)
+    if len(query_ids) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if not BATCH_SCORING:
+        return np.array([fuzz.ratio(queries[q], choices[c]) for q, c in zip(query_ids, choice_ids)], dtype=np.int64)
+
+    # Only the strings that take part in a pair are packed, so choices can be a large list
+    used_queries, pair_queries = _compact(query_ids, len(queries))
+    used_choices, pair_choices = _compact(choice_ids, len(choices))
+    strings = [queries[i] for i in used_queries] + [choices[i] for i in used_choices]
+    return _score_packed(strings, pair_queries, pair_choices + len(used_queries), score_cutoff)
+
+
+def _score_packed(strings, pair_queries, pair_choices, score_cutoff):
+    """Scores pairs of positions into one list of strings, as score_pairs does."""
+    codes, lengths, alphabet = _char_codes(strings)
+    len_a, len_b = lengths[pair_queries], lengths[pair_choices]
+    # The shorter length bounds the LCS, which already rules out most pairs...
+    scores = _ratio(np.minimum(len_a, len_b), len_a, len_b)
+    scored = np.flatnonzero(scores >= score_cutoff)
+
+    # ...and so do the characters the two strings have in common, counted with repeats
+    counts = np.bincount((np.arange(len(strings))[:, None] * alphabet + codes).ravel(),
+                         minlength=len(strings) * alphabet).reshape(len(strings), alphabet)
+    counts[:, 0] = 0
+    counts = counts.astype(np.int16 if lengths.max() < 2 ** 15 else np.int64)
+    common = np.minimum(counts[pair_queries[scored]], counts[pair_choices[scored]]).sum(axis=1, dtype=np.int64)
+    scores[scored] = _ratio(common, len_a[scored], len_b[scored])
+    scored = scored[scores[scored] >= score_cutoff]
+
+    swap = len_a[scored] < len_b[scored]
+    longer = np.where(swap, pair_choices[scored], pair_queries[scored])
+    shorter = np.where(swap, pair_queries[scored], pair_choices[scored])
+    lcs = _lcs_lengths(codes, lengths, longer, shorter, alphabet)
+    scores[scored] = _ratio(lcs, len_a[scored], len_b[scored])
+    return scores
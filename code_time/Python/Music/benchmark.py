@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import ew
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# -------------------------------
+# Synthetic Libraries
+# -------------------------------
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+SEED_LIBRARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'music_library.csv')
+
+def load_vocabulary(seed_file=SEED_LIBRARY):
+    """
+    Collects the words, artists and albums of the seed library, so synthetic
+    songs look like the real ones (title lengths, character set, artist names).
+
+    :param seed_file: CSV with 'Song Name', 'Artist' and 'Album' columns.
+    :return: Dictionary of 'words', 'title_lengths', 'artists' and 'albums' lists.
+    """
+    df = pd.read_csv(seed_file)
+    # The library contains repeated header lines
+    df = df[df['Song Name'] != 'Song Name'].dropna(subset=['Song Name', 'Artist'])
+    titles = df['Song Name'].astype(str).str.split()
+    return {
+        'words': sorted({word for title in titles for word in title}),
+        'title_lengths': titles.str.len().tolist(),
+        'artists': sorted(df['Artist'].astype(str).unique()),
+        'albums': sorted(df['Album'].dropna().astype(str).unique()),
+    }
+
+def add_typos(text, rng, typos):
+    """Applies a number of single character insertions, deletions, substitutions and swaps."""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    chars = list(text)
+    for _ in range(typos):
+        position = rng.randrange(len(chars) + 1)
+        kind = rng.random()
+        if kind < 0.25 or not chars:
+            chars.insert(position, rng.choice(letters))
+        elif position == len(chars):
+            continue
+        elif kind < 0.5:
+            del chars[position]
+        elif kind < 0.75:
+            chars[position] = rng.choice(letters)
+        elif position + 1 < len(chars):
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+    return ''.join(chars)
+
+def make_library(rows, duplicate_rate=0.1, typo_rate=0.5, seed=0, vocabulary=None):
+    """
+    Generates a synthetic music library.
+
+    Unique songs get titles built from the seed library's words, with its title
+    lengths, and artists drawn from a pool that grows with the library. Then
+    duplicate_rate of the rows are replaced by copies of earlier songs; a
+    typo_rate share of those copies get one to three typos in the title, the
+    rest repeat it exactly (up to case).
+
+    :param rows: Number of rows to generate.
+    :param duplicate_rate: Share of rows that copy an earlier song.
+    :param typo_rate: Share of the copies that carry typos.
+    :param seed: Random seed; the same arguments always give the same library.
+    :param vocabulary: Optional result of load_vocabulary.
+    :return: (DataFrame with 'Song Name', 'Artist', 'Album', 'Duration', number of copies).
+    """
+    vocabulary = vocabulary or load_vocabulary()
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    words = np.array(vocabulary['words'], dtype=object)
+
+    # About 15 songs per artist, as in the seed library; new artists are made of seed words
+    artist_count = max(len(vocabulary['artists']), rows // 15)
+    artists = list(vocabulary['artists'])
+    while len(artists) < artist_count:
+        artists.append(' '.join(rng.choice(vocabulary['words']) for _ in range(rng.randint(1, 3))))
+    albums = list(vocabulary['albums'])
+
+    lengths = np_rng.choice(vocabulary['title_lengths'], size=rows)
+    picks = np_rng.integers(0, len(words), size=int(lengths.sum()))
+    title_words = np.split(words[picks], np.cumsum(lengths)[:-1])
+    df = pd.DataFrame({
+        'Song Name': [' '.join(title) for title in title_words],
+        'Artist': np.array(artists, dtype=object)[np_rng.integers(0, len(artists), size=rows)],
+        'Album': np.array(albums, dtype=object)[np_rng.integers(0, len(albums), size=rows)],
+        'Duration': np_rng.integers(90, 420, size=rows),
+    })
+
+    # Overwrite random rows with copies of earlier rows
+    copies = np.flatnonzero(np_rng.random(rows) < duplicate_rate)
+    copies = copies[copies > 0]
+    sources = (np_rng.random(len(copies)) * copies).astype(np.int64)
+    columns = {column: df[column].to_numpy(copy=True) for column in df.columns}
+    song_names = columns['Song Name']
+    # In order, so a copy of a copy gets the already copied values
+    for copy, source in zip(copies, sources):
+        for values in columns.values():
+            values[copy] = values[source]
+        if rng.random() < typo_rate:
+            song_names[copy] = add_typos(song_names[copy], rng, rng.randint(1, 3))
+        elif rng.random() < 0.5:
+            song_names[copy] = song_names[copy].lower()
+    df = pd.DataFrame(columns)
+    df['Duration'] = ew.seconds_to_duration(df['Duration'])
+    return df, len(copies)
+
+# -------------------------------
+# Measuring Stages
+# -------------------------------
+
+def peak_rss_mb():
+    """Highest resident memory of this process so far, in MB, or None where unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+def measure(stage, rows, function, trace_memory=False):
+    """
+    Runs one stage, timing it and noting the memory it needed.
+
+    :param stage: Name of the stage.
+    :param rows: Number of rows the stage handles.
+    :param function: Callable running the stage.
+    :param trace_memory: Also track the peak of the stage's own allocations with
+                         tracemalloc. This is exact per stage but slows it down a lot,
+                         so the timing is then not comparable.
+    :return: (result of function, dictionary of measurements).
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function()
+        seconds = time.perf_counter() - start
+        traced = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return result, {
+        'stage': stage,
+        'rows': rows,
+        'seconds': round(seconds, 4),
+        'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+        # Process high-water mark: each size runs in its own process, so this is
+        # the peak of this stage or of an earlier stage of the same size
+        'peak_rss_mb': peak_rss_mb(),
+        'traced_peak_mb': round(traced / 2 ** 20, 2) if traced is not None else None,
+    }
+
+def run_size(rows, args, vocabulary, work_dir):
+    """
+    Generates a library of the given size and runs every pipeline stage on it.
+    Stages run in order on the previous stage's output, as in ew.main().
+
+    :return: Dictionary of results for this size.
+    """
+    df, copies = make_library(rows, args.duplicate_rate, args.typo_rate, args.seed, vocabulary)
+    input_file = os.path.join(work_dir, f'library_{rows}.csv')
+    output_file = os.path.join(work_dir, f'organized_{rows}.csv')
+    df.to_csv(input_file, index=False)
+    del df
+    baseline = peak_rss_mb()
+
+    trace = args.trace_memory
+    stages = []
+    df, result = measure('load', rows, lambda: ew.load_csv(input_file), trace)
+    stages.append(result)
+    df_cleaned, result = measure('dedup', len(df), lambda: ew.remove_duplicates(df, args.threshold, args.workers), trace)
+    stages.append(result)
+    genre_mapping = ew.load_genre_mapping()
+    df_with_genres, result = measure('genre', len(df_cleaned), lambda: ew.assign_genres(
+        df_cleaned, genre_mapping=genre_mapping, prompt=False), trace)
+    stages.append(result)
+    _, result = measure('export', len(df_with_genres), lambda: ew.export_csv(df_with_genres, output_file), trace)
+    stages.append(result)
+
+    for path in (input_file, output_file):
+        if os.path.exists(path):
+            os.remove(path)
+    return {
+        'rows': rows,
+        'injected_copies': copies,
+        'duplicates_found': len(df) - len(df_cleaned),
+        # Memory already used once the library was generated, before the first stage
+        'baseline_rss_mb': baseline,
+        'stages': stages,
+    }
+
+# -------------------------------
+# Main Function
+# -------------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the music pipeline on synthetic libraries.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="library sizes to run (default: %(default)s)")
+    parser.add_argument('--duplicate-rate', type=float, default=0.1,
+                        help="share of rows that copy an earlier song (default: %(default)s)")
+    parser.add_argument('--typo-rate', type=float, default=0.5,
+                        help="share of the copies with typos (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: %(default)s)")
+    parser.add_argument('-t', '--threshold', type=int, default=90,
+                        help="similarity threshold for duplicates (default: %(default)s)")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="processes to score duplicates with (default: %(default)s)")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="also measure each stage's allocations with tracemalloc (much slower)")
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help="JSON file to write the results to (default: %(default)s)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    vocabulary = load_vocabulary()
+    report = {
+        'settings': {
+            'duplicate_rate': args.duplicate_rate,
+            'typo_rate': args.typo_rate,
+            'seed': args.seed,
+            'threshold': args.threshold,
+            'workers': args.workers,
+            'memory_traced': args.trace_memory,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows in args.sizes:
+            print(f"\n=== {rows:,} rows ===")
+            # A fresh process per size keeps the memory high-water marks apart
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                report['results'].append(executor.submit(run_size, rows, args, vocabulary, work_dir).result())
+            # Write after every size, so a long run still leaves results behind
+            with open(args.output, 'w') as file:
+                json.dump(report, file, indent=2)
+
+    print("\n--- Benchmark Results ---")
+    for result in report['results']:
+        for stage in result['stages']:
+            memory = f"{stage['peak_rss_mb']:9.1f} MB peak" if stage['peak_rss_mb'] is not None else ""
+            print(f"{result['rows']:>9,} rows  {stage['stage']:<7} {stage['seconds']:9.3f} s  "
+                  f"{stage['rows_per_sec'] or 0:>12,.0f} rows/sec {memory}")
+    print(f"\nWrote benchmark results to '{args.output}'.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,618 @@
+import bisect
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from fuzzywuzzy import utils
+from batch_scoring import score_pairs
+
+# -------------------------------
+# Blocking Index for Fuzzy Deduplication
+# -------------------------------
+#
+# fuzz.token_sort_ratio(a, b) is fuzz.ratio() of the two token-sorted keys, and
+# fuzz.ratio() is 2 * M / (len(a) + len(b)) where M is never more than the
+# longest common subsequence of the keys. So two keys can only reach the
+# threshold if their lengths are close and one can be turned into the other
+# with a limited number of single character insertions and deletions.
+#
+# Each indexed key is cut into one more segment than the number of edits it can
+# absorb. A key within that many edits must contain at least one segment
+# unchanged, near the same position, so a lookup only has to check those
+# substrings. Keys too short to cut into useful segments are compared by length
+# bucket instead. Either way the index finds every match a full scan would.
+#
+# Segments are stored as a sorted NumPy array of 64-bit hashes next to the ids
+# of their keys, with a directory of where each run of leading hash bits starts.
+# A whole batch of keys is looked up at once: the hashes of every substring a
+# lookup has to check come from one set of prefix sums, and the directory takes
+# each of them straight to the few table entries it can equal. A hash collision
+# only adds a candidate that scoring then rejects.
+
+MIN_SEGMENT_LENGTH = 2
+# Rows looked up and scored together in one batch by find_duplicates
+BLOCK_SIZE = 256
+# Keys hashed together when adding to the index, which bounds the memory used
+HASH_BATCH = 4096
+# Polynomial hash in wrapping 64-bit arithmetic, salted with the key length and segment number
+HASH_BASE = 0x100000001B3
+HASH_INVERSE = pow(HASH_BASE, -1, 2 ** 64)
+HASH_LENGTH = 0x9E3779B97F4A7C15
+HASH_SEGMENT = 0xC2B2AE3D27D4EB4F
+
+
+def sort_key(text):
+    """
+    Returns the token-sorted key that fuzz.token_sort_ratio compares.
+
+    :param text: Raw string, e.g. the 'combined' song/artist string.
+    :return: Cleaned, lowercased string with its tokens sorted.
+    """
+    tokens = utils.full_process(text, force_ascii=True).split()
+    return " ".join(sorted(tokens)).strip()
+
+
+def _rolling_hashes(keys):
+    """
+    Prefix sums that hash any substring of a batch of keys in constant time.
+
+    The keys are laid end to end and character k is weighted by HASH_INVERSE ** k,
+    so (sums[o + n] - sums[o]) * powers[o] hashes the n characters starting at
+    offset o to the same value wherever they appear.
+
+    :param keys: List of keys.
+    :return: (sums, powers, offsets) arrays, offsets being where each key starts.
+    """
+    lengths = np.array([len(key) for key in keys], dtype=np.int64)
+    # UTF-32 has one fixed-size unit per character, so offsets line up with str indexes
+    codes = np.frombuffer("".join(keys).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    weights = np.ones(len(codes), dtype=np.uint64)
+    np.cumprod(np.full(max(len(codes) - 1, 0), HASH_INVERSE, dtype=np.uint64), out=weights[1:])
+    powers = np.ones(len(codes), dtype=np.uint64)
+    np.cumprod(np.full(max(len(codes) - 1, 0), HASH_BASE, dtype=np.uint64), out=powers[1:])
+    sums = np.zeros(len(codes) + 1, dtype=np.uint64)
+    np.cumsum(codes * weights, out=sums[1:])
+    return sums, powers, np.cumsum(lengths) - lengths
+
+
+def _segment_hashes(sums, powers, offsets, lengths, salts):
+    """Hashes of the substrings at these offsets and lengths, see _rolling_hashes."""
+    return (sums[offsets + lengths] - sums[offsets]) * powers[offsets] + salts
+
+
+def _segment_salt(length, segment):
+    """Salt that keeps equal text in different key lengths or segments apart."""
+    return (length * HASH_LENGTH + segment * HASH_SEGMENT) % 2 ** 64
+
+
+_EMPTY_LAYOUT = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64))
+
+
+def _expand_ranges(starts, counts):
+    """Concatenates range(start, start + count) for every start and count."""
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+
+class BlockingIndex:
+    """
+    Index of unique keys that finds, for a batch of new keys, the indexed keys
+    that share a block with them and so might score at or above the threshold.
+    """
+    def __init__(self, threshold=90):
+        """
+        :param threshold: Similarity score threshold to consider duplicates.
+        """
+        self.threshold = threshold
+        self.keys = []
+        self.ids_by_length = {}
+        # Sorted list of the key lengths indexed
+        self.lengths = []
+        # Sorted segment hashes and the ids of their keys, plus segments not merged in yet
+        self.segment_hashes = np.zeros(0, dtype=np.uint64)
+        self.segment_ids = np.zeros(0, dtype=np.int64)
+        self._pending = []
+        self._directory = None
+        # Lookups per key length, for the lengths indexed now
+        self._plans = {}
+        self._lengths = {}
+        self._max_edits = {}
+        self._bounds = {}
+        self._layouts = {}
+        self._probes = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def empty_copy(self):
+        """Returns an empty index with the same threshold, sharing the tables cached per key length."""
+        index = BlockingIndex(self.threshold)
+        index._lengths = self._lengths
+        index._max_edits = self._max_edits
+        index._bounds = self._bounds
+        index._layouts = self._layouts
+        index._probes = self._probes
+        return index
+
+    # ---- Bounds ----
+
+    def _scan_all(self):
+        """True when the threshold is so low that every pair is a candidate."""
+        return 2 * self.threshold - 1 <= 0
+
+    def _compatible(self, len_a, len_b):
+        """True if two keys of these lengths can reach the threshold at all."""
+        return (2 * self.threshold - 1) * (len_a + len_b) <= 400 * min(len_a, len_b)
+
+    def _edits(self, len_a, len_b):
+        """Most insertions/deletions between two keys of these lengths that still reach the threshold."""
+        # Smallest common subsequence that still rounds up to the threshold
+        lcs = -(-(2 * self.threshold - 1) * (len_a + len_b) // 400)
+        return len_a + len_b - 2 * lcs
+
+    def compatible_lengths(self, length):
+        """Range of key lengths that can reach the threshold against a key of this length."""
+        if length not in self._lengths:
+            low = high = length
+            factor = 2 * self.threshold - 1
+            if length > 0 and 0 < factor < 400:
+                # Solve the _compatible inequality for the other length, then settle any rounding
+                high = int((400 - factor) * length // factor)
+                low = int(-(-factor * length // (400 - factor)))
+            # Compatible lengths form a contiguous range around 'length'
+            while self._compatible(length, high + 1):
+                high += 1
+            while high >= length and not self._compatible(length, high):
+                high -= 1
+            while low > 0 and self._compatible(length, low - 1):
+                low -= 1
+            while low < length and not self._compatible(length, low):
+                low += 1
+            self._lengths[length] = range(low, high + 1) if high >= length else range(length, length)
+        return self._lengths[length]
+
+    def max_edits(self, length):
+        """Most edits any match of a key of this length can be away from it."""
+        if length not in self._max_edits:
+            self._max_edits[length] = max((self._edits(length, other) for other in self.compatible_lengths(length)),
+                                          default=0)
+        return self._max_edits[length]
+
+    def _segment_bounds(self, length):
+        """
+        Splits a key length into max_edits + 1 segments.
+
+        :return: List of (start, length) tuples, or None if the segments would be too short.
+        """
+        if length not in self._bounds:
+            count = self.max_edits(length) + 1
+            size = length // count
+            bounds = None
+            if size >= MIN_SEGMENT_LENGTH:
+                # The last 'length % count' segments are one character longer
+                longer_from = count - length % count
+                bounds = []
+                start = 0
+                for i in range(count):
+                    seg_length = size + (1 if i >= longer_from else 0)
+                    bounds.append((start, seg_length))
+                    start += seg_length
+            self._bounds[length] = bounds
+        return self._bounds[length]
+
+    def _segment_layout(self, length):
+        """
+        Segments of an indexed key of this length.
+
+        :return: (starts, lengths, salts) arrays, empty if the key is too short to segment.
+        """
+        if length not in self._layouts:
+            bounds = self._segment_bounds(length) or []
+            self._layouts[length] = (
+                np.array([start for start, _ in bounds], dtype=np.int64),
+                np.array([seg_length for _, seg_length in bounds], dtype=np.int64),
+                np.array([_segment_salt(length, i) for i in range(len(bounds))], dtype=np.uint64),
+            )
+        return self._layouts[length]
+
+    def _probe_layout(self, len_a, len_b):
+        """
+        Substrings to look up in a key of length len_a to find indexed keys of length
+        len_b. A key within the allowed edits of an indexed key contains one of its
+        segments unchanged, shifted by no more than the edits on either side of it.
+
+        :return: (starts, lengths, salts) arrays of the substrings, or None if keys of
+                 length len_b are too short to segment and are all candidates.
+        """
+        if (len_a, len_b) not in self._probes:
+            layout = None
+            bounds = self._segment_bounds(len_b)
+            if bounds is not None:
+                starts, lengths, salts = [], [], []
+                edits = len(bounds) - 1
+                shift = len_a - len_b
+                for i, (start, seg_length) in enumerate(bounds):
+                    # Edits left of segment i are at most i, right of it at most edits - i
+                    low = max(-i, shift - (edits - i))
+                    high = min(i, shift + (edits - i))
+                    salt = _segment_salt(len_b, i)
+                    for offset in range(low, high + 1):
+                        pos = start + offset
+                        if 0 <= pos <= len_a - seg_length:
+                            starts.append(pos)
+                            lengths.append(seg_length)
+                            salts.append(salt)
+                layout = (np.array(starts, dtype=np.int64), np.array(lengths, dtype=np.int64),
+                          np.array(salts, dtype=np.uint64))
+            self._probes[(len_a, len_b)] = layout
+        return self._probes[(len_a, len_b)]
+
+    def _lookup_plan(self, len_a):
+        """
+        Everything to look up for a key of this length, given the lengths indexed now.
+
+        :return: ((starts, lengths, salts) arrays of the substrings to look up, list of
+                 the compatible lengths too short to segment, whose keys are all candidates).
+        """
+        if len_a not in self._plans:
+            compatible = self.compatible_lengths(len_a)
+            first = bisect.bisect_left(self.lengths, compatible.start)
+            last = bisect.bisect_left(self.lengths, compatible.stop)
+            layouts = [_EMPTY_LAYOUT]
+            short = []
+            for len_b in self.lengths[first:last]:
+                layout = self._probe_layout(len_a, len_b)
+                if layout is None:
+                    short.append(len_b)
+                else:
+                    layouts.append(layout)
+            self._plans[len_a] = (tuple(np.concatenate(parts) for parts in zip(*layouts)), short)
+        return self._plans[len_a]
+
+    def segment_table(self):
+        """
+        Merges the segments added since the last lookup into the sorted table.
+
+        :return: (hashes, ids, directory, shift) where the entries whose hashes start
+                 with the bits b = hash >> shift are at directory[b]:directory[b + 1].
+        """
+        if self._pending:
+            hashes = np.concatenate([hashes for hashes, _ in self._pending])
+            ids = np.concatenate([ids for _, ids in self._pending])
+            order = np.argsort(hashes, kind='stable')
+            at = np.searchsorted(self.segment_hashes, hashes[order])
+            self.segment_hashes = np.insert(self.segment_hashes, at, hashes[order])
+            self.segment_ids = np.insert(self.segment_ids, at, ids[order])
+            self._pending = []
+            self._directory = None
+        if self._directory is None:
+            # About one entry per run of leading bits
+            bits = max(1, int(len(self.segment_hashes)).bit_length())
+            shift = np.uint64(64 - bits)
+            runs = np.zeros(2 ** bits + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.segment_hashes >> shift, minlength=2 ** bits), out=runs[1:])
+            self._directory = (runs, shift)
+        return (self.segment_hashes, self.segment_ids) + self._directory
+
+    # ---- Lookup ----
+
+    def batch_candidates(self, keys):
+        """
+        Looks up the ids of indexed keys that might score at or above the threshold,
+        for a batch of keys at once.
+
+        :param keys: List of token-sorted keys.
+        :return: (query_ids, choice_ids) arrays with one entry per candidate pair,
+                 query_ids being positions in keys. Sorted by query, then by id.
+        """
+        count = len(self.keys)
+        if count == 0 or len(keys) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        if self._scan_all():
+            return np.repeat(np.arange(len(keys)), count), np.tile(np.arange(count), len(keys))
+
+        table_hashes, table_ids, directory, shift = self.segment_table()
+        lengths = [len(key) for key in keys]
+        plans = {length: self._lookup_plan(length) for length in set(lengths)}
+        layouts = [plans[length][0] for length in lengths]
+        rows = np.repeat(np.arange(len(keys)), [len(starts) for starts, _, _ in layouts])
+        starts, seg_lengths, salts = (np.concatenate(parts) for parts in zip(*layouts))
+        sums, powers, offsets = _rolling_hashes(keys)
+        probes = _segment_hashes(sums, powers, offsets[rows] + starts, seg_lengths, salts)
+        runs = probes >> shift
+        low = directory[runs]
+        sizes = directory[runs + np.uint64(1)] - low
+        entries = _expand_ranges(low, sizes)
+        probe_rows = np.repeat(np.arange(len(probes)), sizes)
+        equal = table_hashes[entries] == probes[probe_rows]
+        query_ids = [rows[probe_rows[equal]]]
+        choice_ids = [table_ids[entries[equal]]]
+
+        # Keys too short to segment are candidates by their length alone
+        lengths = np.array(lengths)
+        for length, (_, short_lengths) in plans.items():
+            short = [key_id for len_b in short_lengths for key_id in self.ids_by_length[len_b]]
+            if short:
+                same = np.flatnonzero(lengths == length)
+                query_ids.append(np.repeat(same, len(short)))
+                choice_ids.append(np.tile(np.array(short, dtype=np.int64), len(same)))
+
+        pairs = np.unique(np.concatenate(query_ids) * count + np.concatenate(choice_ids))
+        return pairs // count, pairs % count
+
+    def add_many(self, keys, segments=None):
+        """
+        Adds keys to the index, hashing their segments in batches.
+
+        :param keys: List of token-sorted keys.
+        :param segments: Optional (hashes, ids) arrays of the segments of these keys, as
+                         segment_table() of an index of just them with the same threshold
+                         returns. They are used instead of hashing the keys again.
+        :return: Range of the ids of the new entries.
+        """
+        first_id = len(self.keys)
+        self.keys.extend(keys)
+        for key_id, key in enumerate(keys, first_id):
+            if len(key) not in self.ids_by_length:
+                bisect.insort(self.lengths, len(key))
+                self.ids_by_length[len(key)] = []
+                self._plans = {}
+            self.ids_by_length[len(key)].append(key_id)
+        if self._scan_all():
+            return range(first_id, len(self.keys))
+        if segments is not None:
+            self._pending.append((segments[0], segments[1] + first_id))
+            return range(first_id, len(self.keys))
+        for batch_start in range(0, len(keys), HASH_BATCH):
+            batch = keys[batch_start:batch_start + HASH_BATCH]
+            layouts = [self._segment_layout(len(key)) for key in batch]
+            rows = np.repeat(np.arange(len(batch)), [len(starts) for starts, _, _ in layouts])
+            starts, seg_lengths, salts = (np.concatenate(parts) for parts in zip(*layouts))
+            sums, powers, offsets = _rolling_hashes(batch)
+            hashes = _segment_hashes(sums, powers, offsets[rows] + starts, seg_lengths, salts)
+            self._pending.append((hashes, rows + first_id + batch_start))
+        return range(first_id, len(self.keys))
+
+
+class DedupHistory:
+    """
+    Songs kept so far, so a library can be deduplicated a chunk at a time with
+    the same result as deduplicating it in one go.
+    """
+    def __init__(self, threshold=90):
+        """
+        :param threshold: Similarity score threshold to consider duplicates.
+        """
+        self.index = BlockingIndex(threshold)
+        # Hashes of normalized song/artist pairs already seen, for the exact pre-pass
+        self.hashes = set()
+        # Content hashes of whole input files already merged
+        self.files = set()
+        # (size, modification time) of the organized library the history was saved with
+        self.library = None
+
+    def save(self, path, library=None):
+        """
+        Saves the kept keys, seen hashes and merged files to an SQLite database so a
+        later run can continue from them. The index segments are saved as well, so
+        loading does not have to hash every key again.
+
+        :param path: Path of the database file. An existing one is replaced as a whole.
+        :param library: Optional (size, modification time) of the organized library.
+        """
+        temp_path = path + '.tmp'
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        segment_hashes, segment_ids = self.index.segment_table()[:2]
+        connection = sqlite3.connect(temp_path)
+        try:
+            with connection:
+                connection.execute("CREATE TABLE info (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+                connection.execute("CREATE TABLE keys (id INTEGER PRIMARY KEY, key TEXT NOT NULL)")
+                connection.execute("CREATE TABLE files (digest TEXT PRIMARY KEY)")
+                connection.execute("CREATE TABLE arrays (name TEXT PRIMARY KEY, data BLOB NOT NULL)")
+                connection.executemany("INSERT INTO info (name, value) VALUES (?, ?)", [
+                    ('threshold', json.dumps(self.index.threshold)),
+                    ('library', json.dumps(library)),
+                ])
+                connection.executemany("INSERT INTO keys (id, key) VALUES (?, ?)", enumerate(self.index.keys))
+                connection.executemany("INSERT INTO files (digest) VALUES (?)", ((digest,) for digest in self.files))
+                # uint64 hashes do not fit SQLite's signed integers, so arrays are stored as raw bytes
+                connection.executemany("INSERT INTO arrays (name, data) VALUES (?, ?)", [
+                    ('hashes', np.fromiter(self.hashes, dtype=np.uint64, count=len(self.hashes)).tobytes()),
+                    ('segment_hashes', segment_hashes.astype(np.uint64).tobytes()),
+                    ('segment_ids', segment_ids.astype(np.int64).tobytes()),
+                ])
+        finally:
+            connection.close()
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, threshold=90):
+        """
+        Loads a history written by save(). The saved index segments are used if they
+        were built for the same threshold, otherwise the keys are indexed again.
+
+        :param path: Path of the database file written by save().
+        :param threshold: Similarity score threshold to consider duplicates.
+        :return: DedupHistory.
+        """
+        connection = sqlite3.connect(path)
+        try:
+            info = {name: json.loads(value) for name, value in connection.execute("SELECT name, value FROM info")}
+            keys = [key for key, in connection.execute("SELECT key FROM keys ORDER BY id")]
+            files = {digest for digest, in connection.execute("SELECT digest FROM files")}
+            arrays = dict(connection.execute("SELECT name, data FROM arrays"))
+        finally:
+            connection.close()
+
+        history = cls(threshold)
+        segments = None
+        if info.get('threshold') == threshold:
+            segments = (np.frombuffer(arrays['segment_hashes'], dtype=np.uint64),
+                        np.frombuffer(arrays['segment_ids'], dtype=np.int64))
+            if len(segments[0]) != len(segments[1]) or not np.all((segments[1] >= 0) & (segments[1] < len(keys))):
+                raise ValueError(f"The index segments in '{path}' do not match its keys")
+        history.index.add_many(keys, segments)
+        history.hashes = set(np.frombuffer(arrays['hashes'], dtype=np.uint64).tolist())
+        history.files = files
+        history.library = tuple(info['library']) if info.get('library') else None
+        return history
+
+
+# -------------------------------
+# Finding Duplicates
+# -------------------------------
+
+class DisjointSet:
+    """
+    Union-find over positions 0..size-1, used to group duplicates into clusters.
+    """
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            # Path halving keeps the trees flat
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        """Merges the groups of a and b, keeping the smaller position as the root."""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def _scored_matches(index, keys, first_position=None):
+    """
+    Looks up and scores the index candidates of a batch of keys in one go.
+
+    :param index: BlockingIndex to look the keys up in.
+    :param keys: List of token-sorted keys.
+    :param first_position: If the keys are themselves indexed from this id on, only
+                           matches with earlier ids are returned.
+    :return: (query_ids, choice_ids) arrays of the pairs at or above the threshold,
+             sorted by query, and bounds so the matches of query i are at bounds[i]:bounds[i + 1].
+    """
+    query_ids, choice_ids = index.batch_candidates(keys)
+    if first_position is not None:
+        earlier = choice_ids < query_ids + first_position
+        query_ids, choice_ids = query_ids[earlier], choice_ids[earlier]
+    hits = score_pairs(keys, index.keys, query_ids, choice_ids, index.threshold) >= index.threshold
+    query_ids, choice_ids = query_ids[hits], choice_ids[hits]
+    return query_ids, choice_ids, np.searchsorted(query_ids, np.arange(len(keys) + 1))
+
+
+def find_duplicates(keys, threshold=90, index=None, pairs=None):
+    """
+    Finds the positions of duplicate keys, keeping the first key of each group.
+
+    Keys are handled in blocks: each block is looked up and scored in one batch
+    against the index and against a small index of the block itself, and the
+    matches are then resolved in library order.
+
+    :param keys: List of token-sorted keys in library order.
+    :param threshold: Similarity score threshold to consider duplicates.
+    :param index: Optional BlockingIndex of keys kept earlier. Keys kept now are added to it.
+    :param pairs: Optional list to collect (duplicate position, kept position) for every
+                  match that was scored, so duplicates can be clustered without rescoring.
+                  Matches with keys from an earlier index are not included.
+    :return: List of positions of duplicate keys.
+    """
+    if index is None:
+        index = BlockingIndex(threshold)
+    first_id = len(index)
+    kept = []
+    duplicates = []
+    for start in range(0, len(keys), BLOCK_SIZE):
+        block = keys[start:start + BLOCK_SIZE]
+
+        # Matches with keys indexed before this block, and with earlier keys of the block
+        _, choice_ids, bounds = _scored_matches(index, block)
+        block_index = index.empty_copy()
+        block_index.add_many(block)
+        _, block_ids, block_bounds = _scored_matches(block_index, block, 0)
+
+        block_kept = np.zeros(len(block), dtype=bool)
+        for row, key in enumerate(block):
+            position = start + row
+            earlier = choice_ids[bounds[row]:bounds[row + 1]]
+            in_block = block_ids[block_bounds[row]:block_bounds[row + 1]]
+            in_block = in_block[block_kept[in_block]]
+            if len(earlier) == 0 and len(in_block) == 0:
+                kept.append(position)
+                block_kept[row] = True
+                continue
+            duplicates.append(position)
+            if pairs is not None:
+                pairs.extend((position, kept[other_id - first_id]) for other_id in earlier if other_id >= first_id)
+                pairs.extend((position, start + other) for other in in_block)
+        index.add_many([key for key, keep in zip(block, block_kept) if keep])
+    return duplicates
+
+
+# Each worker process indexes every key once and then answers shards of rows
+_worker_keys = None
+_worker_index = None
+
+
+def _init_worker(keys, threshold):
+    global _worker_keys, _worker_index
+    _worker_keys = keys
+    _worker_index = BlockingIndex(threshold)
+    _worker_index.add_many(keys)
+
+
+def _earlier_matches(shard):
+    """Returns, for each position in the shard, the earlier positions scoring at or above the threshold."""
+    start, stop = shard
+    matches = []
+    for block_start in range(start, stop, BLOCK_SIZE):
+        block_stop = min(block_start + BLOCK_SIZE, stop)
+        _, choice_ids, bounds = _scored_matches(_worker_index, _worker_keys[block_start:block_stop], block_start)
+        matches.extend(choice_ids[bounds[row]:bounds[row + 1]].tolist() for row in range(block_stop - block_start))
+    return matches
+
+
+def find_duplicates_parallel(keys, threshold=90, workers=2, pairs=None):
+    """
+    Same result as find_duplicates, with the scoring spread over a process pool.
+
+    The rows are split into shards and each worker scores its rows against all
+    earlier rows. A row is then a duplicate exactly when one of its earlier
+    matches survived, which is decided in a single pass over the shard results.
+
+    Which rows are kept is only known once the matches are resolved in order,
+    so every worker indexes all rows, duplicates included. Each row is then
+    scored against about 1 / (1 - duplicate share) times the candidates the
+    sequential run scores, e.g. 10% more with 10% duplicates, and every worker
+    holds an index of the whole library.
+
+    :param keys: List of token-sorted keys in library order.
+    :param threshold: Similarity score threshold to consider duplicates.
+    :param workers: Number of worker processes.
+    :param pairs: Optional list to collect (duplicate position, kept position) pairs, as in find_duplicates.
+    :return: List of positions of duplicate keys.
+    """
+    # A few shards per worker keeps the pool busy when some shards are slower
+    shard_size = max(1, -(-len(keys) // (workers * 4)))
+    shards = [(start, min(start + shard_size, len(keys))) for start in range(0, len(keys), shard_size)]
+
+    unique = set()
+    duplicates = []
+    position = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(keys, threshold)) as executor:
+        for shard_matches in executor.map(_earlier_matches, shards):
+            for matches in shard_matches:
+                kept_matches = [other for other in matches if other in unique]
+                if kept_matches:
+                    duplicates.append(position)
+                    if pairs is not None:
+                        pairs.extend((position, other) for other in kept_matches)
+                else:
+                    unique.add(position)
+                position += 1
+    return duplicates
@@ -1,122 +1,437 @@
+import numpy as np
 import pandas as pd
-from fuzzywuzzy import fuzz
-from fuzzywuzzy import process
+import argparse
+import hashlib
 import os
+import sys
+import time
+from contextlib import contextmanager
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet support is optional
+    pa = pq = None
+from dedup_index import DedupHistory, DisjointSet, find_duplicates, find_duplicates_parallel, sort_key
+from genre_store import DEFAULT_GENRE_DB, GenreStore
+from genre_inference import DEFAULT_MIN_CONFIDENCE, MIN_SUGGESTION_CONFIDENCE, infer_genres
+from normalize import normalized_songs, song_keys
+
+# -------------------------------
+# Stage Timing
+# -------------------------------
+
+class StageTimer:
+    """
+    Adds up the wall time and rows of each pipeline stage, so runs can report
+    their throughput. A stage may run many times, e.g. once per chunk.
+    """
+    def __init__(self):
+        self.seconds = {}
+        self.rows = {}
+
+    def add(self, stage, seconds, rows):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.rows[stage] = self.rows.get(stage, 0) + rows
+
+    @contextmanager
+    def stage(self, stage, rows=0):
+        """
+        Times the body of a with block as one run of a stage.
+        
+        :param stage: Name of the stage, e.g. 'dedup'.
+        :param rows: Number of rows the stage handles.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, rows)
+
+    def chunks(self, stage, chunks):
+        """Yields the chunks of an iterator, timing the reading of each one as a run of a stage."""
+        chunks = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            self.add(stage, time.perf_counter() - start, 0 if chunk is None else len(chunk))
+            if chunk is None:
+                return
+            yield chunk
+
+    def report(self):
+        """Prints the wall time and rows per second of every stage."""
+        print("\n--- Stage Timing ---")
+        for stage, seconds in self.seconds.items():
+            rows = self.rows[stage]
+            rate = f"{rows / seconds:,.0f} rows/sec" if seconds > 0 else "n/a rows/sec"
+            print(f"{stage:<8} {seconds:9.3f} s  {rows:>10,} rows  {rate}")
 
 # -------------------------------
 # Step 1: Load the CSV File
 # -------------------------------
 
-def load_csv(file_path):
+def load_csv(file_path, chunksize=None, columns=None):
     """
-    Loads the CSV file into a pandas DataFrame.
+    Loads the CSV file into a pandas DataFrame. A '.parquet' file written by
+    export_parquet is read as well.
     
-    :param file_path: Path to the CSV file.
-    :return: pandas DataFrame.
+    :param file_path: Path to the CSV or Parquet file.
+    :param chunksize: If given, stream the file instead, as DataFrames of at most this many
+                      entries with compact dtypes (see compact_dtypes).
+    :param columns: Optional list of the columns to read; the rest are never parsed.
+    :return: pandas DataFrame, or an iterator of DataFrames when chunksize is given.
     """
     try:
-        df = pd.read_csv(file_path)
+        if is_parquet(file_path):
+            return load_parquet(file_path, chunksize, columns)
+        if chunksize:
+            reader = pd.read_csv(file_path, chunksize=chunksize, usecols=columns,
+                                 dtype={'Artist': 'category', 'Album': 'category'})
+            print(f"Streaming '{file_path}' in chunks of {chunksize} entries.")
+            return (compact_dtypes(chunk) for chunk in reader)
+        df = pd.read_csv(file_path, usecols=columns)
         print(f"Successfully loaded '{file_path}' with {len(df)} entries.")
         return df
     except FileNotFoundError:
         print(f"Error: The file '{file_path}' was not found.")
-        exit()
+        sys.exit(1)
     except pd.errors.EmptyDataError:
         print(f"Error: The file '{file_path}' is empty.")
-        exit()
+        sys.exit(1)
     except Exception as e:
         print(f"An error occurred while loading the file: {e}")
-        exit()
+        sys.exit(1)
+
+def duration_to_seconds(durations):
+    """
+    Parses 'm:ss' (or 'h:mm:ss') durations into whole seconds.
+    
+    :param durations: pandas Series of duration strings.
+    :return: Nullable integer Series, <NA> where a duration could not be parsed.
+    """
+    parts = durations.astype(str).str.extract(r'^\s*(?:(?:(\d+):)?(\d+):)?(\d+)\s*$').astype(float)
+    seconds = parts[0].fillna(0) * 3600 + parts[1].fillna(0) * 60 + parts[2]
+    return seconds.astype('Int32')
+
+def seconds_to_duration(seconds):
+    """
+    Formats whole seconds back into 'm:ss', or 'h:mm:ss' from an hour up.
+    
+    :param seconds: pandas Series of integer seconds.
+    :return: Series of duration strings, empty where seconds is missing.
+    """
+    minutes = seconds // 60
+    secs = (seconds % 60).astype(str).str.zfill(2)
+    short = minutes.astype(str) + ':' + secs
+    long = (minutes // 60).astype(str) + ':' + (minutes % 60).astype(str).str.zfill(2) + ':' + secs
+    text = short.where((minutes < 60).fillna(True), long)
+    return text.where(seconds.notna(), '')
+
+def song_seconds(df):
+    """
+    Returns the durations of a library's songs in whole seconds, whether its
+    'Duration' column still holds 'm:ss' text or was already converted.
+    
+    :param df: pandas DataFrame containing the music library.
+    :return: Nullable integer Series.
+    """
+    if pd.api.types.is_numeric_dtype(df['Duration']):
+        return df['Duration'].astype('Int32')
+    return duration_to_seconds(df['Duration'])
+
+def compact_dtypes(df):
+    """
+    Shrinks a loaded library for streaming: categorical 'Artist'/'Album' and integer 'Duration' seconds.
+    
+    :param df: pandas DataFrame as read from the CSV.
+    :return: The same DataFrame with compact columns.
+    """
+    for column in ('Artist', 'Album'):
+        if column in df and df[column].dtype != 'category':
+            df[column] = df[column].astype('category')
+    if 'Duration' in df and not pd.api.types.is_integer_dtype(df['Duration']):
+        seconds = duration_to_seconds(df['Duration'])
+        # Text that is no duration (e.g. a repeated header line) is kept, as the all-at-once pipeline keeps it
+        if not (seconds.isna() & df['Duration'].notna()).any():
+            df['Duration'] = seconds
+    return df
 
 # -------------------------------
 # Step 2: Remove Duplicates
 # -------------------------------
 
-def remove_duplicates(df, threshold=90):
+def song_hashes(df):
+    """
+    Hashes each song's normalized 'Song Name' and 'Artist' (see normalize.py).
+    
+    :param df: pandas DataFrame containing the music library.
+    :return: Series of uint64 hashes.
+    """
+    return pd.util.hash_pandas_object(normalized_songs(df), index=False)
+
+def exact_duplicates(df, seen=None):
+    """
+    Flags songs whose normalized 'Song Name' and 'Artist' exactly match an earlier
+    song's. These are always fuzzy duplicates as well.
+    
+    :param df: pandas DataFrame containing the music library.
+    :param seen: Optional set of the song hashes of earlier chunks, which count as
+                 earlier songs. The hashes of the new songs are added to it.
+    :return: Boolean Series, True for every repeat after the first.
+    """
+    hashes = song_hashes(df)
+    is_duplicate = hashes.duplicated()
+    if seen is not None:
+        is_duplicate |= np.fromiter((h in seen for h in hashes), dtype=bool, count=len(hashes))
+        seen.update(hashes[~is_duplicate])
+    return is_duplicate
+
+def remove_duplicates(df, threshold=90, workers=1, history=None):
     """
-    Removes duplicate songs based on fuzzy matching of 'Song Name' and 'Artist'.
+    Removes duplicate songs based on fuzzy matching of the normalized 'Song Name'
+    and 'Artist', so featuring credits, bracketed tags, punctuation and the order
+    of multiple artists do not matter. Exact repeats are dropped first, then each remaining song is only scored
+    against the earlier unique songs that share a block in a BlockingIndex,
+    which finds the same duplicates as scoring all of them.
     
     :param df: pandas DataFrame containing the music library.
     :param threshold: Similarity score threshold to consider duplicates.
+    :param workers: Number of processes to score with. The result is the same for any value.
+    :param history: Optional DedupHistory of songs kept from earlier chunks. Songs matching
+                    those are dropped as well, and the songs kept here are added to it.
+                    Scoring then runs in this process.
     :return: DataFrame without duplicates.
     """
-    df = df.copy()
-    # Create a combined string for matching
-    df['combined'] = (df['Song Name'].astype(str) + " " + df['Artist'].astype(str)).str.lower()
-    
-    unique_songs = []
-    duplicates = []
-    
-    for index, row in df.iterrows():
-        song = row['combined']
-        if not unique_songs:
-            unique_songs.append(song)
-            continue
-        # Find the best match in unique_songs
-        match, score = process.extractOne(song, unique_songs, scorer=fuzz.token_sort_ratio)
-        if score < threshold:
-            unique_songs.append(song)
-        else:
-            duplicates.append(index)
+    # Only the first copy of an exact repeat goes on to fuzzy matching
+    is_duplicate = exact_duplicates(df, history.hashes if history is not None else None).to_numpy(copy=True)
+    exact_count = int(is_duplicate.sum())
+    survivors = np.flatnonzero(~is_duplicate)
+    keys = [sort_key(song) for song in song_keys(df).to_numpy()[survivors]]
+    
+    # Keep the first song of each group, like a full process.extractOne scan
+    if history is not None:
+        positions = find_duplicates(keys, index=history.index)
+    elif workers > 1 and len(keys) > 1:
+        positions = find_duplicates_parallel(keys, threshold, workers)
+    else:
+        positions = find_duplicates(keys, threshold)
+    is_duplicate[survivors[positions]] = True
     
-    print(f"Found {len(duplicates)} duplicate entries out of {len(df)} total songs.")
-    df_cleaned = df.drop(duplicates).drop('combined', axis=1)
+    print(f"Found {int(is_duplicate.sum())} duplicate entries ({exact_count} exact) out of {len(df)} total songs.")
+    df_cleaned = df[~is_duplicate]
     return df_cleaned
 
+# -------------------------------
+# Step 2b: Cluster Duplicates
+# -------------------------------
+
+def metadata_length(df):
+    """Canonical rule: prefer the copy with the most filled-in metadata."""
+    columns = [column for column in ('Song Name', 'Artist', 'Album', 'Duration') if column in df]
+    lengths = [df[column].astype(str).str.len().where(df[column].notna(), 0) for column in columns]
+    return sum(lengths)
+
+def album_frequency(df):
+    """Canonical rule: prefer the copy whose album is the most common within its cluster."""
+    counts = df.groupby(['cluster', df['Album'].astype(str)], observed=True)['cluster'].transform('size')
+    return counts.where(df['Album'].notna(), 0)
+
+# Rules for picking the row to keep from each cluster. Each returns a score per row;
+# the highest score wins and ties go to the earliest row.
+CANONICAL_RULES = {
+    'first': lambda df: pd.Series(0, index=df.index),
+    'longest': metadata_length,
+    'common_album': album_frequency,
+}
+
+def cluster_duplicates(df, threshold=90, rule='first', report_file=None, workers=1):
+    """
+    Groups every variant of a song into a cluster and keeps one canonical row per cluster.
+    
+    Clusters are built with union-find over the pairs scored while finding duplicates,
+    so there is no extra scoring pass. A duplicate that matches several kept songs joins
+    their clusters together.
+    
+    :param df: pandas DataFrame containing the music library.
+    :param threshold: Similarity score threshold to consider duplicates.
+    :param rule: Name in CANONICAL_RULES, or a function taking the DataFrame with a
+                 'cluster' column and returning a score per row.
+    :param report_file: Optional path of a CSV listing every cluster with more than one song.
+    :param workers: Number of processes to score with.
+    :return: DataFrame with one row per cluster, in library order.
+    """
+    score_rows = CANONICAL_RULES[rule] if isinstance(rule, str) else rule
+    positions = np.arange(len(df))
+    groups = DisjointSet(len(df))
+    
+    # Exact repeats join the cluster of their first copy
+    hashes = song_hashes(df).to_numpy()
+    first_copy = pd.Series(positions).groupby(hashes).transform('first').to_numpy()
+    for position in np.flatnonzero(first_copy != positions):
+        groups.union(position, first_copy[position])
+    
+    # Fuzzy matches join the clusters of every kept song they scored against
+    survivors = np.flatnonzero(first_copy == positions)
+    keys = [sort_key(song) for song in song_keys(df).to_numpy()[survivors]]
+    pairs = []
+    if workers > 1 and len(keys) > 1:
+        find_duplicates_parallel(keys, threshold, workers, pairs=pairs)
+    else:
+        find_duplicates(keys, threshold, pairs=pairs)
+    for duplicate, kept in pairs:
+        groups.union(survivors[duplicate], survivors[kept])
+    clusters = np.array([groups.find(position) for position in positions], dtype=np.int64)
+    
+    # Highest score first within each cluster, earliest row on ties
+    scores = np.asarray(score_rows(df.assign(cluster=clusters)), dtype=float)
+    order = np.lexsort((positions, -scores, clusters))
+    is_canonical = np.zeros(len(df), dtype=bool)
+    is_canonical[order[np.r_[True, clusters[order][1:] != clusters[order][:-1]]]] = True
+    
+    cluster_sizes = np.bincount(clusters, minlength=len(df))[clusters]
+    print(f"Grouped {len(df)} songs into {int(is_canonical.sum())} clusters, "
+          f"{int((cluster_sizes > 1).sum())} songs are in clusters with duplicates.")
+    
+    if report_file:
+        in_cluster = cluster_sizes > 1
+        report = df[in_cluster].copy()
+        report.insert(0, 'Canonical', is_canonical[in_cluster])
+        report.insert(0, 'Cluster', pd.factorize(clusters[in_cluster])[0] + 1)
+        try:
+            report.sort_values('Cluster', kind='stable').to_csv(report_file, index=False)
+            print(f"Wrote duplicate clusters report to '{report_file}'.")
+        except Exception as e:
+            print(f"An error occurred while writing the duplicates report: {e}")
+    
+    return df[is_canonical]
+
 # -------------------------------
 # Step 3: Assign Genres
 # -------------------------------
 
-def assign_genres(df):
+# Predefined genre mapping (extend this dictionary as needed)
+GENRE_MAPPING = {
+    'kendrick lamarr': 'Hip-Hop/Rap',
+    'mac miller': 'Hip-Hop/Rap',
+    'j. cole': 'Hip-Hop/Rap',
+    'chance the rapper': 'Hip-Hop/Rap',
+    'juice wrld': 'Hip-Hop/Rap',
+    'the weeknd': 'R&B',
+    'drake': 'Hip-Hop/Rap',
+    'asap rocky': 'Hip-Hop/Rap',
+    'xxxtentacion': 'Hip-Hop/Rap',
+    'lil baby': 'Hip-Hop/Rap',
+    'travis scott': 'Hip-Hop/Rap',
+    'billie holiday': 'Jazz',
+    'kanye west': 'Hip-Hop/Rap',
+    'lil uzi vert': 'Hip-Hop/Rap',
+    'gorillaz': 'Alternative/Rock',
+    'jasmine': 'Jazz',
+    'simon & garfunkel': 'Folk/Rock',
+    # Add more artists and their genres here
+}
+
+def load_genre_mapping(store=None):
     """
-    Assigns genres to each song. It first tries to assign genres based on a predefined mapping.
-    If a song's artist is not in the mapping, it prompts the user to input the genre.
+    Combines the predefined mapping with the genres saved in the store by earlier runs.
+    
+    :param store: Optional GenreStore.
+    :return: Dictionary of lowercased artist -> genre.
+    """
+    genre_mapping = dict(GENRE_MAPPING)
+    if store is not None:
+        genre_mapping.update(store.load_all())
+    return genre_mapping
+
+def assign_genres(df, store=None, genre_mapping=None, prompt=True, default_genre='',
+                  min_confidence=DEFAULT_MIN_CONFIDENCE, guesses=None):
+    """
+    Assigns genres to each song. It first tries to assign genres based on a predefined mapping
+    and any genres saved in the store by earlier runs.
+    Artists in neither get the genre of the known artists most like them (see
+    genre_inference.py) where that guess is confident enough. For the rest it prompts
+    the user once per artist. Enter skips the artist; a guess that is not too weak
+    is offered, and only saved if the user accepts it with '+'.
     
     :param df: pandas DataFrame without duplicates.
+    :param store: Optional GenreStore. New answers are saved to it for the next run.
+    :param genre_mapping: Optional mapping from load_genre_mapping to use instead of loading one.
+                          Answers (including skips) are added to it, so calls sharing it
+                          never ask about the same artist twice.
+    :param prompt: Set to False to never wait for input, e.g. in unattended runs.
+    :param default_genre: Genre given to the songs of unknown artists when not prompting.
+    :param min_confidence: Confidence (0-1) from which guessed genres are used without asking.
+                           Above 1 no genre is guessed.
+    :param guesses: Optional dictionary of artist -> guessed genre shared between calls.
+                    Confident guesses are added to it and reused for those artists,
+                    but unlike genre_mapping it is never taken for labelled artists,
+                    so one guess never leads to another.
     :return: DataFrame with an added 'Genre' column.
     """
     df = df.copy()
-    df['Genre'] = ''
-    
-    # Predefined genre mapping (extend this dictionary as needed)
-    genre_mapping = {
-        'kendrick lamarr': 'Hip-Hop/Rap',
-        'mac miller': 'Hip-Hop/Rap',
-        'j. cole': 'Hip-Hop/Rap',
-        'chance the rapper': 'Hip-Hop/Rap',
-        'juice wrld': 'Hip-Hop/Rap',
-        'the weeknd': 'R&B',
-        'drake': 'Hip-Hop/Rap',
-        'asap rocky': 'Hip-Hop/Rap',
-        'xxxtentacion': 'Hip-Hop/Rap',
-        'lil baby': 'Hip-Hop/Rap',
-        'travis scott': 'Hip-Hop/Rap',
-        'billie holiday': 'Jazz',
-        'kanye west': 'Hip-Hop/Rap',
-        'lil uzi vert': 'Hip-Hop/Rap',
-        'gorillaz': 'Alternative/Rock',
-        'jasmine': 'Jazz',
-        'simon & garfunkel': 'Folk/Rock',
-        # Add more artists and their genres here
-    }
-    
-    # Function to get genre from mapping or prompt user
-    def get_genre(song_name, artist):
-        artist_lower = artist.lower()
-        if artist_lower in genre_mapping:
-            return genre_mapping[artist_lower]
-        else:
-            genre = input(f"Enter genre for '{song_name}' by {artist} (or press Enter to skip): ").strip()
-            return genre
+    if genre_mapping is None:
+        genre_mapping = load_genre_mapping(store)
+    if guesses is None:
+        guesses = {}
     
     print("\n--- Genre Assignment ---")
-    print("Assigning genres based on predefined mapping. For unknown artists, you'll be prompted to enter the genre.\n")
+    if prompt:
+        print("Assigning genres based on predefined mapping. For unknown artists, you'll be prompted to enter the genre.\n")
+    else:
+        print("Assigning genres based on predefined mapping. Unknown artists are not prompted for.\n")
+    
+    # Resolve every known artist in one pass
+    artist_keys = df['Artist'].astype(str).str.lower()
+    genres = artist_keys.map(genre_mapping)
+    genres = genres.where(genres.notna(), artist_keys.map(guesses))
+    
+    unknown = genres.isna()
+    
+    # Guess the genres of all unknown artists in one batch
+    suggestions = {}
+    if unknown.any() and min_confidence <= 1:
+        proposals = infer_genres(df, artist_keys, genre_mapping, artist_keys[unknown].unique())
+        confident = proposals['Confidence'] >= min_confidence
+        inferred = proposals.loc[confident, 'Genre'].to_dict()
+        offered = ~confident & (proposals['Confidence'] >= MIN_SUGGESTION_CONFIDENCE)
+        suggestions = proposals.loc[offered, 'Genre'].to_dict()
+        print(f"Inferred genres for {len(inferred)} of {artist_keys[unknown].nunique()} unknown artists.")
+        # Guesses are reused by later chunks, but neither saved nor used to guess others
+        guesses.update(inferred)
+        genres = genres.where(~unknown, artist_keys.map(inferred))
+        unknown = genres.isna()
+    
+    if not prompt:
+        df['Genre'] = genres.fillna(default_genre)
+        print(f"Gave {int(unknown.sum())} songs by {artist_keys[unknown].nunique()} unknown artists "
+              f"the genre '{default_genre}'.")
+        print("\nGenre assignment completed.\n")
+        return df
     
-    for index, row in df.iterrows():
-        song = row['Song Name']
-        artist = row['Artist']
-        genre = get_genre(song, artist)
-        df.at[index, 'Genre'] = genre
+    # Prompt once per unknown artist, in the order they first appear
+    unknown_songs = df.loc[unknown, ['Song Name', 'Artist']].assign(artist_key=artist_keys[unknown])
+    song_counts = unknown_songs['artist_key'].value_counts()
+    first_songs = unknown_songs.drop_duplicates('artist_key')
+    prompted = {}
+    for artist_key, song, artist in zip(first_songs['artist_key'], first_songs['Song Name'], first_songs['Artist']):
+        count = song_counts[artist_key]
+        songs_text = f"'{song}'" if count == 1 else f"'{song}' and {count - 1} more"
+        suggestion = suggestions.get(artist_key)
+        if suggestion:
+            answer = input(f"Enter genre for {songs_text} by {artist} "
+                           f"(+ for '{suggestion}', or press Enter to skip): ").strip()
+            prompted[artist_key] = suggestion if answer == '+' else answer
+        else:
+            prompted[artist_key] = input(f"Enter genre for {songs_text} by {artist} (or press Enter to skip): ").strip()
+        # Skipped artists are asked again next time
+        if store is not None and prompted[artist_key]:
+            store.add(artist_key, prompted[artist_key])
+    if store is not None:
+        store.flush()
+    genre_mapping.update(prompted)
+    
+    # Share each answer with all of that artist's songs
+    df['Genre'] = genres.where(~unknown, artist_keys.map(prompted)).fillna('')
     
     print("\nGenre assignment completed.\n")
     return df
@@ -125,44 +440,557 @@ def assign_genres(df):
 # Step 4: Export to New CSV
 # -------------------------------
 
-def export_csv(df, output_file):
+def export_csv(df, output_file, append=False):
     """
     Exports the DataFrame to a CSV file.
     
     :param df: pandas DataFrame to export.
     :param output_file: Path to the output CSV file.
+    :param append: Add the rows to the end of an existing export instead of overwriting it.
+                   They are written in the order of its header, which must have the same columns.
+    :return: True if the file was written.
     """
     try:
-        df.to_csv(output_file, index=False)
-        print(f"Successfully exported organized library to '{output_file}'.")
+        if append and os.path.exists(output_file):
+            header = list(pd.read_csv(output_file, nrows=0).columns)
+            if set(header) != set(df.columns):
+                raise ValueError(f"the columns {list(df.columns)} do not match the header {header} of '{output_file}'")
+            df = df[header]
+        if 'Duration' in df and pd.api.types.is_integer_dtype(df['Duration']):
+            df = df.assign(Duration=seconds_to_duration(df['Duration']))
+        df.to_csv(output_file, index=False, mode='a' if append else 'w', header=not append)
+        if append:
+            print(f"Appended {len(df)} entries to '{output_file}'.")
+        else:
+            print(f"Successfully exported organized library to '{output_file}'.")
+        return True
     except Exception as e:
         print(f"An error occurred while exporting the file: {e}")
+        return False
+
+# -------------------------------
+# Step 4a: Columnar Export
+# -------------------------------
+
+# Columns with few distinct values, stored once per file instead of once per song
+DICTIONARY_COLUMNS = ('Artist', 'Album', 'Genre', 'Source File')
+
+def is_parquet(file_path):
+    """True if a path names a Parquet file rather than a CSV."""
+    return str(file_path).lower().endswith('.parquet')
+
+def require_pyarrow():
+    if pq is None:
+        raise ImportError("Parquet files need pyarrow, install it with 'pip install pyarrow'.")
+
+def library_table(df):
+    """
+    Converts a library to an Arrow table: dictionary-encoded 'Artist', 'Album' and
+    'Genre', 'Duration' as integer seconds and the other columns as strings.
+    The schema only depends on the columns, so chunks can go into one file.
+    
+    :param df: pandas DataFrame of the library.
+    :return: pyarrow.Table.
+    """
+    require_pyarrow()
+    df = df.copy()
+    if 'Duration' in df and not pd.api.types.is_integer_dtype(df['Duration']):
+        df['Duration'] = duration_to_seconds(df['Duration'])
+    fields = []
+    for column in df.columns:
+        if column in DICTIONARY_COLUMNS:
+            df[column] = df[column].astype('string').astype('category')
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        elif column == 'Duration':
+            fields.append(pa.field(column, pa.int32()))
+        else:
+            df[column] = df[column].astype('string')
+            fields.append(pa.field(column, pa.string()))
+    return pa.Table.from_pandas(df, preserve_index=False).cast(pa.schema(fields))
+
+def load_parquet(file_path, chunksize=None, columns=None):
+    """
+    Loads a Parquet library, as load_csv does for CSV files. Only the requested
+    columns are read from disk.
+    
+    :param file_path: Path to the Parquet file.
+    :param chunksize: If given, stream the file in DataFrames of at most this many entries.
+    :param columns: Optional list of the columns to read.
+    :return: pandas DataFrame, or an iterator of DataFrames when chunksize is given.
+    """
+    require_pyarrow()
+    # Keep missing durations as <NA> instead of turning the column into floats
+    types = {pa.int32(): pd.Int32Dtype()}.get
+    if chunksize:
+        batches = pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=columns)
+        print(f"Streaming '{file_path}' in chunks of {chunksize} entries.")
+        return (compact_dtypes(batch.to_pandas(types_mapper=types)) for batch in batches)
+    df = pq.read_table(file_path, columns=columns).to_pandas(types_mapper=types)
+    print(f"Successfully loaded '{file_path}' with {len(df)} entries.")
+    return df
+
+def export_parquet(df, output_file):
+    """
+    Exports the DataFrame to a Parquet file (see library_table for the column types).
+    
+    :param df: pandas DataFrame to export.
+    :param output_file: Path to the output Parquet file.
+    :return: True if the file was written.
+    """
+    with LibraryExporter(output_file) as exporter:
+        exporter.write(df)
+    return exporter.ok
+
+class LibraryExporter:
+    """
+    Writes an organized library a DataFrame at a time: as CSV, or as Parquet
+    with one row group per DataFrame when the output path ends in '.parquet'.
+    
+    Parquet files cannot be appended to, so appending to an existing one copies
+    it, a row group at a time, into a new file. That file replaces the old one on
+    close, but only if every write succeeded; otherwise the old file is kept.
+    """
+    def __init__(self, output_file, append=False):
+        """
+        :param output_file: Path to the output file.
+        :param append: Add to an existing export instead of overwriting it.
+        """
+        self.output_file = output_file
+        self.append = append
+        self.writer = None
+        self.temp_file = None
+        self.columns = None
+        self.ok = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close(commit=exc_type is None)
+
+    def write(self, df):
+        """
+        Writes the next part of the library, under the columns of the first part
+        in their order, whatever the column order of the input it came from.
+        
+        :param df: pandas DataFrame to export.
+        :return: True if the rows were written.
+        """
+        if self.columns is None:
+            self.columns = list(df.columns)
+        elif list(df.columns) != self.columns:
+            extra = [column for column in df.columns if column not in self.columns]
+            if extra:
+                print(f"Dropping the columns {extra}, earlier parts of '{self.output_file}' do not have them.")
+            df = df.reindex(columns=self.columns)
+        if not is_parquet(self.output_file):
+            written = export_csv(df, self.output_file, append=self.append)
+            self.append = True
+        else:
+            written = self._write_parquet(df)
+        self.ok = self.ok and written
+        return written
+
+    def _write_parquet(self, df):
+        try:
+            table = library_table(df)
+            if self.writer is None:
+                self._open(table.schema)
+            self.writer.write_table(table.cast(self.writer.schema))
+            print(f"Wrote {len(df)} entries to '{self.output_file}'.")
+            return True
+        except Exception as e:
+            print(f"An error occurred while exporting the file: {e}")
+            return False
+
+    def _open(self, schema):
+        if not (self.append and os.path.exists(self.output_file)):
+            self.writer = pq.ParquetWriter(self.output_file, schema)
+            return
+        self.temp_file = self.output_file + '.tmp'
+        with pq.ParquetFile(self.output_file) as existing:
+            self.writer = pq.ParquetWriter(self.temp_file, existing.schema_arrow)
+            # One row group at a time, so memory use does not grow with the library
+            for i in range(existing.num_row_groups):
+                self.writer.write_table(existing.read_row_group(i))
+
+    def close(self, commit=True):
+        """
+        Finishes the export. An appended Parquet copy replaces the old file only if
+        commit is set and every write succeeded; otherwise the copy is deleted.
+        
+        :param commit: Set to False to discard an appended Parquet copy, e.g. after an error.
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if self.temp_file:
+            if commit and self.ok:
+                os.replace(self.temp_file, self.output_file)
+            elif os.path.exists(self.temp_file):
+                os.remove(self.temp_file)
+            self.temp_file = None
+
+# -------------------------------
+# Step 4b: Streaming Pipeline
+# -------------------------------
+
+def organize_in_chunks(input_file, output_file, chunksize, threshold=90, store=None,
+                       prompt=True, default_genre='', timer=None,
+                       min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """
+    Runs the whole pipeline a chunk at a time, so memory use does not grow with
+    the size of the input. Each chunk is deduplicated against everything kept so
+    far, tagged with genres and appended to the output before the next is read,
+    keeping the same songs as the all-at-once pipeline. Guessed genres can still
+    differ for a few artists, as each chunk's guesses only compare the songs in it.
+    
+    :param input_file: Path to the input CSV file.
+    :param output_file: Path to the output CSV file.
+    :param chunksize: Number of entries to read at a time.
+    :param threshold: Similarity score threshold to consider duplicates.
+    :param store: Optional GenreStore to reuse and save genres with.
+    :param prompt: Set to False to never prompt for genres (see assign_genres).
+    :param default_genre: Genre for unknown artists when not prompting.
+    :param min_confidence: Confidence from which guessed genres are used (see assign_genres).
+    :param timer: Optional StageTimer to add the time of each stage to.
+    :return: True if every chunk was exported.
+    """
+    timer = timer or StageTimer()
+    history = DedupHistory(threshold)
+    genre_mapping = load_genre_mapping(store)
+    guesses = {}
+    with LibraryExporter(output_file) as exporter:
+        for chunk in timer.chunks('load', load_csv(input_file, chunksize=chunksize)):
+            with timer.stage('dedup', len(chunk)):
+                df_cleaned = remove_duplicates(chunk, threshold, history=history)
+            with timer.stage('genre', len(df_cleaned)):
+                df_with_genres = assign_genres(df_cleaned, store, genre_mapping, prompt, default_genre,
+                                               min_confidence, guesses)
+            with timer.stage('export', len(df_with_genres)):
+                if not exporter.write(df_with_genres):
+                    return False
+    return True
+
+# -------------------------------
+# Step 4c: Incremental Runs
+# -------------------------------
+
+def history_file_for(output_file):
+    """Path of the saved dedup history that belongs to an organized library."""
+    return os.path.splitext(output_file)[0] + '.dedup.db'
+
+def library_stamp(output_file):
+    """(size, modification time) of an organized library, or None if it does not exist."""
+    if not os.path.exists(output_file):
+        return None
+    stat = os.stat(output_file)
+    return (stat.st_size, stat.st_mtime_ns)
+
+def build_history(df, threshold=90):
+    """
+    Builds a dedup history from an already organized library, treating every song in it as kept.
+    
+    :param df: pandas DataFrame of the organized library.
+    :param threshold: Similarity score threshold to consider duplicates.
+    :return: DedupHistory.
+    """
+    history = DedupHistory(threshold)
+    history.hashes.update(song_hashes(df))
+    history.index.add_many([sort_key(song) for song in song_keys(df)])
+    return history
+
+def load_history(output_file, threshold=90):
+    """
+    Loads the dedup history saved next to an organized library. If there is none,
+    or it was saved with another version of the library (e.g. the library was
+    edited or replaced since), the history is built from the library itself.
+    
+    :param output_file: Path to the organized library.
+    :param threshold: Similarity score threshold to consider duplicates.
+    :return: DedupHistory, empty if the library does not exist yet.
+    """
+    history_file = history_file_for(output_file)
+    if not os.path.exists(output_file):
+        if os.path.exists(history_file):
+            print(f"Ignoring the dedup history '{history_file}', as '{output_file}' does not exist.")
+        return DedupHistory(threshold)
+    if os.path.exists(history_file):
+        try:
+            history = DedupHistory.load(history_file, threshold)
+        except Exception as e:
+            print(f"Error loading the dedup history '{history_file}': {e}")
+        else:
+            if history.library == library_stamp(output_file):
+                print(f"Loaded dedup history of {len(history.index)} songs from '{history_file}'.")
+                return history
+            print(f"The dedup history '{history_file}' does not match '{output_file}'.")
+        print(f"Rebuilding the dedup history from '{output_file}'.")
+    return build_history(load_csv(output_file), threshold)
+
+def organize_incrementally(input_file, output_file, threshold=90, store=None, chunksize=None,
+                           prompt=True, default_genre='', timer=None,
+                           min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """
+    Adds only the new songs of the input to an existing organized library.
+    
+    The history saved next to the output by the previous run (or, failing that,
+    one built from the output itself) already knows every song seen before. Old
+    songs are dropped by the hash pre-pass without any fuzzy scoring, so a run
+    costs time in proportion to what was added. The input can be the whole
+    catalog or just the new rows.
+    
+    :param input_file: Path to the input CSV file.
+    :param output_file: Path to the organized library to extend.
+    :param threshold: Similarity score threshold to consider duplicates.
+    :param store: Optional GenreStore to reuse and save genres with.
+    :param chunksize: If given, read the input this many entries at a time.
+    :param prompt: Set to False to never prompt for genres (see assign_genres).
+    :param default_genre: Genre for unknown artists when not prompting.
+    :param min_confidence: Confidence from which guessed genres are used (see assign_genres).
+    :param timer: Optional StageTimer to add the time of each stage to.
+    :return: True if every new song was exported.
+    """
+    timer = timer or StageTimer()
+    history_file = history_file_for(output_file)
+    with timer.stage('load'):
+        history = load_history(output_file, threshold)
+    
+    genre_mapping = load_genre_mapping(store)
+    guesses = {}
+    # Read lazily either way, so the load is timed with the other stages
+    chunks = load_csv(input_file, chunksize=chunksize) if chunksize else (load_csv(path) for path in [input_file])
+    with LibraryExporter(output_file, append=os.path.exists(output_file)) as exporter:
+        for chunk in timer.chunks('load', chunks):
+            with timer.stage('dedup', len(chunk)):
+                df_new = remove_duplicates(chunk, threshold, history=history)
+            if len(df_new):
+                with timer.stage('genre', len(df_new)):
+                    df_with_genres = assign_genres(df_new, store, genre_mapping, prompt, default_genre,
+                                                   min_confidence, guesses)
+                with timer.stage('export', len(df_with_genres)):
+                    if not exporter.write(df_with_genres):
+                        return False
+    
+    history.save(history_file, library_stamp(output_file))
+    print(f"Saved dedup history of {len(history.index)} songs to '{history_file}'.")
+    return True
+
+# -------------------------------
+# Step 4d: Merging Several Libraries
+# -------------------------------
+
+# Column recording which input file each merged song came from
+SOURCE_COLUMN = 'Source File'
+
+def file_digest(file_path, block_size=1 << 20):
+    """SHA-256 of a file's contents, read a block at a time."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Columns every input of a merge must have
+REQUIRED_COLUMNS = ('Song Name', 'Artist')
+
+def file_columns(file_path):
+    """Column names of a CSV or Parquet library, read without loading any rows."""
+    if is_parquet(file_path):
+        require_pyarrow()
+        return list(pq.read_schema(file_path).names)
+    return list(pd.read_csv(file_path, nrows=0).columns)
+
+def organize_many(input_files, output_file, threshold=90, store=None, chunksize=None,
+                  prompt=True, default_genre='', timer=None, incremental=False,
+                  min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """
+    Merges several exports of a library into one organized library.
+    
+    All inputs go through one dedup history, in the order given, so a song is
+    kept from the first file it appears in and every later copy is dropped. A
+    'Source File' column records that file for every kept song. A file whose
+    contents were already merged, e.g. a plain copy of another input, is
+    skipped after hashing it, without being parsed. Every file must have the
+    'Song Name' and 'Artist' columns, and is written in the column order of the
+    first one.
+    
+    :param input_files: Paths to the input CSV (or Parquet) files.
+    :param output_file: Path to the output file.
+    :param threshold: Similarity score threshold to consider duplicates.
+    :param store: Optional GenreStore to reuse and save genres with.
+    :param chunksize: If given, read each input this many entries at a time.
+    :param prompt: Set to False to never prompt for genres (see assign_genres).
+    :param default_genre: Genre for unknown artists when not prompting.
+    :param min_confidence: Confidence from which guessed genres are used (see assign_genres).
+    :param timer: Optional StageTimer to add the time of each stage to.
+    :param incremental: Continue from the history of an earlier run and add to its output,
+                        skipping files merged by earlier runs too.
+    :return: True if every new song was exported.
+    """
+    timer = timer or StageTimer()
+    for input_file in input_files:
+        try:
+            missing = [column for column in REQUIRED_COLUMNS if column not in file_columns(input_file)]
+        except Exception as e:
+            print(f"An error occurred while loading '{input_file}': {e}")
+            return False
+        if missing:
+            print(f"Error: '{input_file}' has no {' or '.join(repr(column) for column in missing)} column.")
+            return False
+    
+    history_file = history_file_for(output_file)
+    with timer.stage('load'):
+        history = load_history(output_file, threshold) if incremental else DedupHistory(threshold)
+    
+    genre_mapping = load_genre_mapping(store)
+    guesses = {}
+    with LibraryExporter(output_file, append=incremental and os.path.exists(output_file)) as exporter:
+        for input_file in input_files:
+            with timer.stage('load'):
+                digest = file_digest(input_file)
+            if digest in history.files:
+                print(f"Skipping '{input_file}', the same contents were already merged.")
+                continue
+            history.files.add(digest)
+            
+            chunks = load_csv(input_file, chunksize=chunksize) if chunksize else (load_csv(path) for path in [input_file])
+            for chunk in timer.chunks('load', chunks):
+                with timer.stage('dedup', len(chunk)):
+                    df_new = remove_duplicates(chunk, threshold, history=history)
+                if not len(df_new):
+                    continue
+                df_new = df_new.assign(**{SOURCE_COLUMN: input_file})
+                with timer.stage('genre', len(df_new)):
+                    df_with_genres = assign_genres(df_new, store, genre_mapping, prompt, default_genre,
+                                                   min_confidence, guesses)
+                with timer.stage('export', len(df_with_genres)):
+                    if not exporter.write(df_with_genres):
+                        return False
+    
+    if incremental:
+        history.save(history_file, library_stamp(output_file))
+        print(f"Saved dedup history of {len(history.index)} songs to '{history_file}'.")
+    return True
 
 # -------------------------------
 # Step 5: Main Function
 # -------------------------------
 
-def main():
-    # Define input and output file paths
-    input_file = 'music_library.csv'  # Replace with your actual input file name
-    output_file = 'organized_music_library.csv'  # Desired output file name
+def parse_args(argv=None):
+    """
+    Reads the command line options. Without any, the pipeline runs as it always
+    has: on 'music_library.csv', prompting for unknown genres.
     
-    # Check if input file exists
-    if not os.path.exists(input_file):
-        print(f"Error: The input file '{input_file}' does not exist in the current directory.")
-        exit()
+    :param argv: Optional list of arguments instead of sys.argv.
+    :return: argparse.Namespace.
+    """
+    parser = argparse.ArgumentParser(description="Deduplicate a music library CSV and tag it with genres.")
+    parser.add_argument('input_files', nargs='*', default=['music_library.csv'],
+                        help="CSV (or .parquet) files to organize; several are merged into one library, "
+                             "noting each song's source file (default: music_library.csv)")
+    parser.add_argument('-o', '--output', dest='output_file', default='organized_music_library.csv',
+                        help="file to write the organized library to, as Parquet if it ends in "
+                             ".parquet (default: %(default)s)")
+    parser.add_argument('-t', '--threshold', type=int, default=90,
+                        help="similarity score (0-100) at which two songs are duplicates (default: %(default)s)")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="processes to score duplicates with, for a single input file without "
+                             "--chunksize or --incremental (default: %(default)s)")
+    parser.add_argument('--no-prompts', action='store_true',
+                        help="never ask for genres; unknown artists get --unknown-genre")
+    parser.add_argument('--unknown-genre', default='',
+                        help="genre for unknown artists with --no-prompts (default: empty)")
+    parser.add_argument('--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help="confidence (0-1) from which genres guessed from similar artists are used "
+                             "without asking; above 1 turns guessing off (default: %(default)s)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="stream the input this many entries at a time")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only add songs that are new since the last run to the output")
+    parser.add_argument('--canonical-rule', choices=sorted(CANONICAL_RULES), default=None,
+                        help="keep the best copy of each song by this rule and write a duplicates report, "
+                             "for a single input file without --chunksize or --incremental")
+    parser.add_argument('--report', default='duplicates_report.csv',
+                        help="duplicates report for --canonical-rule (default: %(default)s)")
+    parser.add_argument('--genre-db', default=DEFAULT_GENRE_DB,
+                        help="SQLite file of genres entered in earlier runs (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if not 0 <= args.threshold <= 100:
+        parser.error("--threshold must be between 0 and 100")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunksize is not None and args.chunksize < 1:
+        parser.error("--chunksize must be at least 1")
+    if args.min_confidence < 0:
+        parser.error("--min-confidence must not be negative")
+    # Several files, chunks and incremental runs are deduplicated against a history, in one process
+    if len(args.input_files) > 1 or args.chunksize is not None or args.incremental:
+        if args.canonical_rule:
+            parser.error("--canonical-rule works on a single input file, without --chunksize or --incremental")
+        if args.workers > 1:
+            parser.error("--workers works on a single input file, without --chunksize or --incremental")
+    return args
+
+def main(argv=None):
+    """
+    Runs the pipeline from the command line.
     
-    # Load CSV
-    df = load_csv(input_file)
+    :param argv: Optional list of arguments instead of sys.argv.
+    :return: Exit status, 0 on success.
+    """
+    args = parse_args(argv)
+    prompt = not args.no_prompts
+    timer = StageTimer()
     
-    # Remove Duplicates
-    df_cleaned = remove_duplicates(df, threshold=90)
+    # Check if the input files exist
+    for input_file in args.input_files:
+        if not os.path.exists(input_file):
+            print(f"Error: The input file '{input_file}' does not exist.")
+            return 1
+    input_file = args.input_files[0]
     
-    # Assign Genres
-    df_with_genres = assign_genres(df_cleaned)
+    with GenreStore(args.genre_db) as store:
+        if len(args.input_files) > 1:
+            ok = organize_many(args.input_files, args.output_file, args.threshold, store, args.chunksize,
+                               prompt, args.unknown_genre, timer, args.incremental, args.min_confidence)
+            timer.report()
+            return 0 if ok else 1
+        if args.incremental:
+            ok = organize_incrementally(input_file, args.output_file, args.threshold, store,
+                                        args.chunksize, prompt, args.unknown_genre, timer, args.min_confidence)
+            timer.report()
+            return 0 if ok else 1
+        if args.chunksize:
+            ok = organize_in_chunks(input_file, args.output_file, args.chunksize, args.threshold, store,
+                                    prompt, args.unknown_genre, timer, args.min_confidence)
+            timer.report()
+            return 0 if ok else 1
+        
+        # Load CSV
+        with timer.stage('load'):
+            df = load_csv(input_file)
+        # The row count is only known once the file is read
+        timer.add('load', 0, len(df))
+        
+        # Remove Duplicates
+        with timer.stage('dedup', len(df)):
+            if args.canonical_rule:
+                df_cleaned = cluster_duplicates(df, args.threshold, args.canonical_rule, args.report, args.workers)
+            else:
+                df_cleaned = remove_duplicates(df, args.threshold, args.workers)
+        
+        # Assign Genres, reusing the genres entered in earlier runs
+        with timer.stage('genre', len(df_cleaned)):
+            df_with_genres = assign_genres(df_cleaned, store, prompt=prompt, default_genre=args.unknown_genre,
+                                           min_confidence=args.min_confidence)
     
-    # Export to CSV
-    export_csv(df_with_genres, output_file)
+    # Export to CSV, or Parquet for a '.parquet' output
+    with timer.stage('export', len(df_with_genres)):
+        with LibraryExporter(args.output_file) as exporter:
+            ok = exporter.write(df_with_genres)
+    timer.report()
+    return 0 if ok else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from normalize import normalize_title, split_artists
+
+# -------------------------------
+# Genre Inference for Unknown Artists
+# -------------------------------
+#
+# Each artist is described by a bag of tokens: the names of its main artists
+# (so 'The Weeknd & Kendrick Lamar' shares a token with 'The Weeknd') and the
+# words of its song and album names. Tokens are weighted by TF-IDF, so rare
+# ones like a collaborator's name count for much more than words like 'love',
+# and every artist's weights are scaled to unit length, so the sum of products
+# over shared tokens is their cosine similarity.
+#
+# The similarities of unknown artists to all labelled artists come from one
+# join of their tokens per batch of unknown artists. Each unknown artist then takes the genre with the most
+# similarity among its nearest labelled artists. The confidence is that genre's
+# share of their similarity, scaled down when even the nearest artist is not
+# very similar.
+
+# Labelled artists that vote on an unknown artist's genre
+NEIGHBOURS = 5
+# Nearest similarity at which a vote is fully trusted; below it confidence drops
+STRONG_SIMILARITY = 0.5
+# Tokens of more than this share of the artists are too common to tell genres apart
+COMMON_TOKEN_SHARE = 0.05
+# Unknown artists joined with the labelled ones at a time, which bounds the memory of the join
+BATCH_SIZE = 1000
+DEFAULT_MIN_CONFIDENCE = 0.6
+# Confidence from which a guess is offered at the prompt; weaker guesses are mostly wrong
+MIN_SUGGESTION_CONFIDENCE = 0.4
+
+
+def artist_tokens(df, artist_keys):
+    """
+    Token counts of every artist of a library.
+
+    :param df: pandas DataFrame containing the music library.
+    :param artist_keys: Series of lowercased artist names, aligned with df.
+    :return: DataFrame of 'artist', 'token' and 'count' columns.
+    """
+    names = pd.Series(pd.unique(artist_keys))
+    # Artist names are kept apart from words, so 'drake' the artist is not 'drake' in a title
+    name_tokens = pd.DataFrame({'artist': names, 'token': names.map(split_artists)}).explode('token')
+    name_tokens['token'] = 'artist:' + name_tokens['token']
+
+    text = df['Song Name'].astype(object).fillna('').astype(str)
+    if 'Album' in df.columns:
+        text = text + ' ' + df['Album'].astype(object).fillna('').astype(str)
+    uniques = pd.unique(text)
+    words = pd.Series(text.map(dict(zip(uniques, map(normalize_title, uniques)))).str.split().to_numpy(),
+                      index=artist_keys.to_numpy())
+    word_tokens = words.explode().dropna().rename('token').rename_axis('artist').reset_index()
+
+    tokens = pd.concat([name_tokens, word_tokens], ignore_index=True)
+    tokens = tokens[tokens['token'] != '']
+    return tokens.groupby(['artist', 'token'], sort=False).size().rename('count').reset_index()
+
+
+def _weights(tokens):
+    """Adds unit-length TF-IDF 'weight's to token counts, dropping tokens too common to help."""
+    artists = tokens['artist'].nunique()
+    frequency = tokens.groupby('token')['artist'].transform('size')
+    tokens = tokens[(frequency <= max(COMMON_TOKEN_SHARE * artists, 2)) | tokens['token'].str.startswith('artist:')]
+    frequency = frequency[tokens.index]
+    weight = (1 + np.log(tokens['count'])) * np.log(1 + artists / frequency)
+    norm = np.sqrt((weight ** 2).groupby(tokens['artist']).transform('sum'))
+    return tokens.assign(weight=weight / norm)
+
+
+def infer_genres(df, artist_keys, genre_mapping, unknown_artists, neighbours=NEIGHBOURS):
+    """
+    Proposes genres for unknown artists from the labelled artists most like them.
+
+    :param df: pandas DataFrame containing the music library.
+    :param artist_keys: Series of lowercased artist names, aligned with df.
+    :param genre_mapping: Dictionary of lowercased artist -> genre of the labelled artists.
+                          Labelled artists need not be in df; then only their names are compared.
+    :param unknown_artists: Lowercased names of the artists to propose genres for.
+    :param neighbours: Number of nearest labelled artists that vote.
+    :return: DataFrame indexed by artist with the proposed 'Genre' and its 'Confidence'
+             (0-1). Artists sharing no token with any labelled artist are left out.
+    """
+    labelled = {artist: genre for artist, genre in genre_mapping.items() if genre}
+    unknown_artists = [artist for artist in pd.unique(pd.Series(unknown_artists, dtype=object))
+                       if artist not in labelled]
+    if not labelled or not unknown_artists:
+        return pd.DataFrame({'Genre': pd.Series(dtype=object), 'Confidence': pd.Series(dtype=float)})
+
+    # Labelled artists missing from the library still count with their names
+    known = pd.Series(list(labelled))
+    known = known[~known.isin(set(artist_keys))]
+    songs = df[artist_keys.isin(labelled) | artist_keys.isin(unknown_artists)]
+    keys = artist_keys[songs.index]
+    extra = pd.DataFrame({'Song Name': '', 'Album': ''}, index=range(len(known)))
+    tokens = _weights(artist_tokens(
+        pd.concat([songs, extra], ignore_index=True), pd.concat([keys, known], ignore_index=True)))
+
+    is_labelled = tokens['artist'].isin(labelled)
+    labelled_tokens = tokens[is_labelled]
+    unknown_tokens = tokens[~is_labelled]
+    batches = np.arange(len(unknown_artists)) // BATCH_SIZE
+    nearest = []
+    for batch in np.unique(batches):
+        batch_tokens = unknown_tokens[unknown_tokens['artist'].isin(set(np.array(unknown_artists, dtype=object)[batches == batch]))]
+        pairs = batch_tokens.merge(labelled_tokens, on='token', suffixes=('', '_labelled'))
+        pairs['similarity'] = pairs['weight'] * pairs['weight_labelled']
+        similarity = pairs.groupby(['artist', 'artist_labelled'], sort=False)['similarity'].sum().reset_index()
+        # The nearest labelled artists of each unknown artist
+        similarity = similarity.sort_values(['artist', 'similarity'], ascending=[True, False])
+        nearest.append(similarity.groupby('artist', sort=False).head(neighbours))
+    nearest = pd.concat(nearest, ignore_index=True)
+    if not len(nearest):
+        return pd.DataFrame({'Genre': pd.Series(dtype=object), 'Confidence': pd.Series(dtype=float)})
+
+    # Their votes per genre
+    nearest['genre'] = nearest['artist_labelled'].map(labelled)
+    votes = nearest.groupby(['artist', 'genre'], sort=False)['similarity'].sum()
+    best = votes.sort_values(ascending=False).groupby(level='artist').head(1).reset_index(level='genre')
+
+    total = nearest.groupby('artist')['similarity'].sum()
+    strongest = nearest.groupby('artist')['similarity'].max()
+    confidence = best['similarity'] / total[best.index] * np.minimum(strongest[best.index] / STRONG_SIMILARITY, 1)
+    return pd.DataFrame({'Genre': best['genre'], 'Confidence': confidence.round(3)}).rename_axis(None)
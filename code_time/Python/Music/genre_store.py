@@ -0,0 +1,68 @@
+import sqlite3
+
+# -------------------------------
+# Persistent Artist -> Genre Store
+# -------------------------------
+
+DEFAULT_GENRE_DB = 'genre_cache.db'
+
+
+class GenreStore:
+    """
+    SQLite-backed artist -> genre cache, so genres typed in one run are reused
+    by the next. Artists are stored by their lowercased name.
+    """
+    def __init__(self, db_path=DEFAULT_GENRE_DB, batch_size=50):
+        """
+        :param db_path: Path to the SQLite database file. It is created if missing.
+        :param batch_size: Number of new genres to collect before writing them out.
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.pending = {}
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS artist_genres (artist TEXT PRIMARY KEY, genre TEXT NOT NULL)"
+        )
+        self.connection.commit()
+
+    def load_all(self):
+        """
+        Reads every stored genre in one query.
+
+        :return: Dictionary of lowercased artist -> genre.
+        """
+        return dict(self.connection.execute("SELECT artist, genre FROM artist_genres"))
+
+    def add(self, artist, genre):
+        """
+        Queues a genre to be stored, writing the queue once it reaches batch_size.
+
+        :param artist: Lowercased artist name.
+        :param genre: Genre to remember for the artist.
+        """
+        self.pending[artist] = genre
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes all queued genres in a single transaction."""
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO artist_genres (artist, genre) VALUES (?, ?)",
+                self.pending.items()
+            )
+        self.pending = {}
+
+    def close(self):
+        """Writes any queued genres and closes the database."""
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
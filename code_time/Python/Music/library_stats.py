@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import ew
+from ew import load_csv, exact_duplicates, song_seconds, seconds_to_duration, is_parquet, require_pyarrow
+
+# -------------------------------
+# Library Statistics
+# -------------------------------
+#
+# Song counts, listening time and duplicates per artist and per genre. Each
+# DataFrame (the whole library, or one chunk of it) is reduced with a single
+# groupby over (Artist, Genre), summing songs, duplicates and seconds. The
+# per-artist, per-genre and overall figures are all sums of those partial
+# totals, so chunks can be added up as they stream past and the result is the
+# same as for the whole file.
+#
+# A duplicate is a song whose normalized name and artist exactly match an
+# earlier song's, as in the exact pre-pass of remove_duplicates. Fuzzy
+# duplicates are not counted, which would take a full dedup run.
+
+# Columns read from the library; the rest are never parsed
+STATS_COLUMNS = ['Song Name', 'Artist', 'Duration', 'Genre']
+GROUP_COLUMNS = ['Artist', 'Genre']
+TOTAL_COLUMNS = ['Songs', 'Duplicates', 'Seconds']
+
+
+class LibraryStats:
+    """
+    Totals of a library, added up a DataFrame at a time.
+    """
+    def __init__(self):
+        # Partial totals per (Artist, Genre), summed over everything added so far
+        self.totals = None
+        # Seen song hashes, so duplicates across chunks are counted too
+        self.seen_hashes = set()
+
+    def add(self, df):
+        """
+        Adds the songs of a DataFrame to the totals.
+
+        :param df: pandas DataFrame containing (part of) the music library.
+        """
+        if not len(df):
+            return
+        songs = pd.DataFrame({
+            'Artist': df['Artist'].astype(object).fillna(''),
+            'Genre': df['Genre'].astype(object).fillna('') if 'Genre' in df.columns else '',
+            'Songs': 1,
+            'Duplicates': exact_duplicates(df, self.seen_hashes).to_numpy(dtype=np.int64),
+            'Seconds': song_seconds(df).fillna(0).to_numpy(dtype=np.int64),
+        })
+        totals = songs.groupby(GROUP_COLUMNS, sort=False)[TOTAL_COLUMNS].sum()
+        self.totals = totals if self.totals is None else self.totals.add(totals, fill_value=0).astype(np.int64)
+
+    def _report(self, by):
+        """Totals grouped by one column, with duplicate ratios and readable times, most songs first."""
+        if self.totals is None:
+            return pd.DataFrame(columns=[by] + TOTAL_COLUMNS + ['Duplicate Ratio', 'Total Time'])
+        report = self.totals.groupby(level=by)[TOTAL_COLUMNS].sum()
+        report['Duplicate Ratio'] = (report['Duplicates'] / report['Songs']).round(4)
+        report['Total Time'] = seconds_to_duration(report['Seconds'])
+        return report.sort_values(['Songs', 'Seconds'], ascending=False).reset_index()
+
+    def by_artist(self):
+        """
+        :return: DataFrame of Songs, Duplicates, Seconds, Duplicate Ratio and Total Time per artist.
+        """
+        return self._report('Artist')
+
+    def by_genre(self):
+        """
+        :return: DataFrame of Songs, Duplicates, Seconds, Duplicate Ratio and Total Time per genre.
+        """
+        return self._report('Genre')
+
+    def overall(self):
+        """
+        :return: Dictionary of the totals over the whole library.
+        """
+        totals = self.totals.sum() if self.totals is not None else pd.Series(0, index=TOTAL_COLUMNS)
+        songs, duplicates, seconds = (int(totals[column]) for column in TOTAL_COLUMNS)
+        artists = self.totals.index.get_level_values('Artist').nunique() if self.totals is not None else 0
+        return {
+            'Songs': songs,
+            'Unique Songs': songs - duplicates,
+            'Duplicates': duplicates,
+            'Duplicate Ratio': round(duplicates / songs, 4) if songs else 0.0,
+            'Artists': artists,
+            'Seconds': seconds,
+            'Total Time': seconds_to_duration(pd.Series([seconds]))[0],
+        }
+
+
+def stats_columns(input_file):
+    """The columns of STATS_COLUMNS a library has; libraries not tagged yet have no 'Genre'."""
+    if is_parquet(input_file):
+        require_pyarrow()
+        names = ew.pq.read_schema(input_file).names
+    else:
+        names = pd.read_csv(input_file, nrows=0).columns
+    return [column for column in STATS_COLUMNS if column in names]
+
+
+def library_stats(input_file, chunksize=None):
+    """
+    Computes the statistics of a library file, optionally streaming it in chunks.
+
+    :param input_file: Path to the library (CSV or Parquet).
+    :param chunksize: If given, read this many entries at a time.
+    :return: LibraryStats.
+    """
+    stats = LibraryStats()
+    columns = stats_columns(input_file)
+    if chunksize:
+        chunks = load_csv(input_file, chunksize=chunksize, columns=columns)
+    else:
+        chunks = [load_csv(input_file, columns=columns)]
+    for chunk in chunks:
+        stats.add(chunk)
+    return stats
+
+
+# -------------------------------
+# Main Function
+# -------------------------------
+
+def print_table(title, report, top):
+    """Prints the first rows of a report table."""
+    print(f"\n--- {title} (top {min(top, len(report))} of {len(report)}) ---")
+    for _, row in report.head(top).iterrows():
+        print(f"{str(row.iloc[0]) or '(none)':<40} {row['Songs']:>7} songs {row['Total Time']:>10} "
+              f"{row['Duplicates']:>6} duplicates ({row['Duplicate Ratio']:.1%})")
+
+
+def main(argv=None):
+    """
+    Prints the statistics of a library and writes the per-artist and per-genre tables.
+
+    :param argv: Optional list of arguments instead of sys.argv.
+    :return: Exit status, 0 on success.
+    """
+    parser = argparse.ArgumentParser(description="Song counts, listening time and duplicates of a music library.")
+    parser.add_argument('input_file', nargs='?', default='organized_music_library.csv',
+                        help="library (CSV or .parquet) to report on (default: %(default)s)")
+    parser.add_argument('--chunksize', type=int, default=None, help="stream the library this many entries at a time")
+    parser.add_argument('--top', type=int, default=10, help="rows of each table to print (default: %(default)s)")
+    parser.add_argument('-o', '--output', default='library_stats',
+                        help="prefix of the per-artist and per-genre CSV files (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.chunksize is not None and args.chunksize < 1:
+        parser.error("--chunksize must be at least 1")
+    if not os.path.exists(args.input_file):
+        print(f"Error: The input file '{args.input_file}' does not exist.")
+        return 1
+
+    start = time.perf_counter()
+    stats = library_stats(args.input_file, args.chunksize)
+    by_artist, by_genre = stats.by_artist(), stats.by_genre()
+    print(f"\nComputed statistics in {time.perf_counter() - start:.2f} s.")
+    for name, value in stats.overall().items():
+        print(f"{name:<16} {value:.1%}" if name == 'Duplicate Ratio' else f"{name:<16} {value}")
+    print_table("Artists", by_artist, args.top)
+    print_table("Genres", by_genre, args.top)
+
+    try:
+        by_artist.to_csv(f"{args.output}_artists.csv", index=False)
+        by_genre.to_csv(f"{args.output}_genres.csv", index=False)
+        print(f"\nWrote '{args.output}_artists.csv' and '{args.output}_genres.csv'.")
+    except Exception as e:
+        print(f"An error occurred while exporting the statistics: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import re
+from functools import lru_cache
+import pandas as pd
+
+# -------------------------------
+# Title/Artist Normalization
+# -------------------------------
+#
+# Canonical forms of song names and artists for deduplication, so that
+# "Changes (feat. XXXTENTACION)", "Changes [Bonus Track]" and "changes" all
+# become "changes", and "Drake & Future", "Future, Drake" and "Drake feat. Future"
+# compare equal where the credits allow it.
+#
+# Each distinct raw string is only normalized once: the functions are memoized,
+# and whole columns are normalized one unique value at a time.
+
+FEATURING = r'(?:feat\.?|ft\.?|featuring)'
+
+# "(feat. X)", "[Bonus Track]", "{Live}" and the like
+BRACKETED = re.compile(r'\s*[\(\[\{][^\(\)\[\]\{\}]*[\)\]\}]')
+# A featuring credit outside brackets runs to the end: "Song feat. X", "Drake ft. Future"
+FEATURING_CREDIT = re.compile(rf'(?:\s+-)?\s+{FEATURING}\s.*$', re.IGNORECASE)
+# Separators between the artists of a multi-artist string
+ARTIST_SEPARATORS = re.compile(r'\s*(?:,|;|/|&|\+|\s(?:x|and|with|vs\.?)\s)\s*', re.IGNORECASE)
+APOSTROPHES = re.compile(r"['’`]")
+NON_WORD = re.compile(r'[\W_]+')
+
+# Titles are mostly unique, so only the most recent ones are worth keeping around
+TITLE_CACHE_SIZE = 65536
+
+
+def _clean(text):
+    """Lowercases and drops punctuation, so "Don't Stop!" becomes 'dont stop'."""
+    text = APOSTROPHES.sub('', text.lower())
+    return NON_WORD.sub(' ', text).strip()
+
+
+def _strip_credits(text):
+    """Removes bracketed tags and featuring credits, unless nothing would be left."""
+    stripped = text
+    # Nested brackets come off from the inside out
+    while True:
+        shorter = BRACKETED.sub('', stripped)
+        if shorter == stripped:
+            break
+        stripped = shorter
+    stripped = FEATURING_CREDIT.sub('', stripped)
+    return stripped if _clean(stripped) else text
+
+
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
+def normalize_title(title):
+    """
+    Returns the canonical form of a song name.
+
+    :param title: Raw song name, e.g. 'Changes (feat. XXXTENTACION) [Bonus Track]'.
+    :return: Lowercased name without credits, tags or punctuation, e.g. 'changes'.
+    """
+    return _clean(_strip_credits(title))
+
+
+@lru_cache(maxsize=None)
+def split_artists(artist):
+    """
+    Splits a multi-artist string into its main artists, leaving out featured ones.
+
+    :param artist: Raw artist string, e.g. 'Drake & Future (feat. Young Thug)'.
+    :return: Tuple of canonical artist names, e.g. ('drake', 'future').
+    """
+    names = (_clean(name) for name in ARTIST_SEPARATORS.split(_strip_credits(artist)))
+    names = tuple(dict.fromkeys(name for name in names if name))
+    return names or (_clean(artist),)
+
+
+@lru_cache(maxsize=None)
+def normalize_artist(artist):
+    """
+    Returns the canonical form of an artist string, the same for any order of its artists.
+
+    :param artist: Raw artist string.
+    :return: Canonical artist names, sorted and joined with ', '.
+    """
+    return ', '.join(sorted(split_artists(artist)))
+
+
+def normalize_column(values, normalize):
+    """
+    Applies a normalizer to each distinct value of a Series once, mapping the results back onto every row.
+
+    :param values: pandas Series, e.g. a 'Song Name' or 'Artist' column.
+    :param normalize: Function of one string, e.g. normalize_title.
+    :return: Series of the results, aligned with values.
+    """
+    # Missing values count as empty strings (astype(str) alone keeps them missing in pandas 3)
+    values = values.astype(object).fillna('').astype(str)
+    uniques = pd.unique(values)
+    return values.map(dict(zip(uniques, map(normalize, uniques))))
+
+
+def normalized_songs(df):
+    """
+    Normalizes the 'Song Name' and 'Artist' columns of a library.
+
+    :param df: pandas DataFrame containing the music library.
+    :return: DataFrame with the canonical 'Song Name' and 'Artist' of each song.
+    """
+    return pd.DataFrame({
+        'Song Name': normalize_column(df['Song Name'], normalize_title),
+        'Artist': normalize_column(df['Artist'], normalize_artist),
+    }, index=df.index)
+
+
+def song_keys(df):
+    """
+    Builds the string each song is fuzzy matched on.
+
+    :param df: pandas DataFrame containing the music library.
+    :return: Series of canonical 'song name artists' strings.
+    """
+    songs = normalized_songs(df)
+    return songs['Song Name'] + " " + songs['Artist']
@@ -0,0 +1,158 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from ew import duration_to_seconds, seconds_to_duration, song_seconds, load_csv, export_csv
+from normalize import split_artists, normalize_column
+
+# -------------------------------
+# Duration-Constrained Playlists
+# -------------------------------
+#
+# Picking songs whose durations add up to a target length is a subset sum
+# problem over whole seconds. The sums reachable with the songs seen so far are
+# kept as one boolean array up to the target plus the tolerance, and each song
+# shifts and ORs it in a single NumPy operation. The song that first reached
+# each sum is noted, so a playlist can be read back from any reachable sum by
+# repeatedly taking off that song; it only ever used earlier songs, so no song
+# is picked twice.
+#
+# Songs are taken in a random order and the search stops as soon as the exact
+# target is reachable, which on a real library takes a few dozen songs, so each
+# run gives a different playlist and the cost hardly depends on library size.
+
+
+def filter_songs(df, genres=None, artists=None):
+    """
+    Keeps the songs of some genres and/or artists.
+
+    :param df: pandas DataFrame containing the music library.
+    :param genres: Optional list of genres, matched regardless of case.
+    :param artists: Optional list of artists. A song matches if any of its main artists
+                    does, so 'Queen' also picks 'Queen & David Bowie'.
+    :return: Filtered DataFrame.
+    """
+    keep = pd.Series(True, index=df.index)
+    if genres:
+        wanted = {genre.strip().lower() for genre in genres}
+        keep &= df['Genre'].astype(object).fillna('').astype(str).str.strip().str.lower().isin(wanted)
+    if artists:
+        wanted = {name for artist in artists for name in split_artists(artist)}
+        keep &= normalize_column(df['Artist'], lambda artist: not wanted.isdisjoint(split_artists(artist))).astype(bool)
+    return df[keep]
+
+
+def build_playlist(df, target, tolerance=10, seed=None):
+    """
+    Picks songs adding up to a target length.
+
+    :param df: pandas DataFrame of the songs to choose from.
+    :param target: Target length in seconds.
+    :param tolerance: Seconds the playlist may be shorter or longer than the target.
+    :param seed: Optional random seed, to get the same playlist again.
+    :return: DataFrame of the picked songs, or None if no playlist is within the tolerance.
+    """
+    seconds = song_seconds(df)
+    limit = target + tolerance
+    # Songs without a usable duration, or longer than the whole playlist, cannot be used
+    usable = np.flatnonzero(((seconds > 0) & (seconds <= limit)).fillna(False).to_numpy())
+    order = np.random.default_rng(seed).permutation(usable)
+    durations = seconds.to_numpy(dtype=np.int64, na_value=0)[order]
+
+    reachable = np.zeros(limit + 1, dtype=bool)
+    reachable[0] = True
+    # Position in order of the song that first reached each sum
+    first = np.full(limit + 1, -1, dtype=np.int64)
+    for position, duration in enumerate(durations):
+        new = reachable[:limit + 1 - duration] & ~reachable[duration:]
+        first[duration:][new] = position
+        reachable[duration:] |= new
+        if reachable[target]:
+            break
+
+    # The reachable sum closest to the target, the shorter one of two equally close
+    sums = np.flatnonzero(reachable[max(target - tolerance, 1):]) + max(target - tolerance, 1)
+    if not len(sums):
+        return None
+    total = int(sums[np.argmin(np.abs(sums - target))])
+    picked = []
+    while total:
+        position = first[total]
+        picked.append(order[position])
+        total -= durations[position]
+    return df.iloc[picked[::-1]]
+
+
+# -------------------------------
+# Main Function
+# -------------------------------
+
+def parse_args(argv=None):
+    """
+    Reads the command line options.
+
+    :param argv: Optional list of arguments instead of sys.argv.
+    :return: argparse.Namespace.
+    """
+    parser = argparse.ArgumentParser(description="Build a playlist of a given length from a music library.")
+    parser.add_argument('-l', '--library', default='organized_music_library.csv',
+                        help="library (CSV or .parquet) to pick songs from (default: %(default)s)")
+    parser.add_argument('--length', default='60:00',
+                        help="playlist length as m:ss or h:mm:ss (default: %(default)s)")
+    parser.add_argument('--tolerance', type=int, default=10,
+                        help="seconds the playlist may be off the length (default: %(default)s)")
+    parser.add_argument('-g', '--genre', action='append', dest='genres',
+                        help="only pick songs of this genre (can be given more than once)")
+    parser.add_argument('-a', '--artist', action='append', dest='artists',
+                        help="only pick songs by this artist (can be given more than once)")
+    parser.add_argument('--seed', type=int, default=None, help="random seed, to get the same playlist again")
+    parser.add_argument('-o', '--output', dest='output_file', default=None,
+                        help="CSV file to write the playlist to")
+    args = parser.parse_args(argv)
+    args.target = duration_to_seconds(pd.Series([args.length]))[0]
+    if pd.isna(args.target) or args.target < 1:
+        parser.error("--length must be a duration like 60:00 or 1:30:00")
+    args.target = int(args.target)
+    if args.tolerance < 0:
+        parser.error("--tolerance must not be negative")
+    return args
+
+
+def main(argv=None):
+    """
+    Builds a playlist from the command line.
+
+    :param argv: Optional list of arguments instead of sys.argv.
+    :return: Exit status, 0 on success.
+    """
+    args = parse_args(argv)
+    if not os.path.exists(args.library):
+        print(f"Error: The library '{args.library}' does not exist.")
+        return 1
+
+    df = load_csv(args.library)
+    if args.genres and 'Genre' not in df.columns:
+        print(f"Error: The library '{args.library}' has no 'Genre' column to pick genres from.")
+        return 1
+    df = filter_songs(df, args.genres, args.artists)
+    start = time.perf_counter()
+    playlist = build_playlist(df, args.target, args.tolerance, args.seed)
+    elapsed = time.perf_counter() - start
+    if playlist is None:
+        print(f"No playlist of {args.length} (± {args.tolerance} s) can be made from the {len(df)} matching songs.")
+        return 1
+
+    seconds = song_seconds(playlist)
+    for (_, song), duration in zip(playlist.iterrows(), seconds_to_duration(seconds)):
+        print(f"{duration:>8}  {song['Song Name']} - {song['Artist']}")
+    total = seconds_to_duration(pd.Series([int(seconds.sum())]))[0]
+    print(f"\n{len(playlist)} songs, {total} in total (picked from {len(df)} songs in {elapsed * 1000:.1f} ms).")
+    if args.output_file and not export_csv(playlist, args.output_file):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from fuzzywuzzy import fuzz
+from normalize import normalize_title, normalized_songs, normalize_column
+
+# -------------------------------
+# Fuzzy Song Search
+# -------------------------------
+#
+# Every song of an organized library becomes one normalized text,
+# " title artists album ", cut into overlapping 3-character grams. An inverted
+# index maps each gram to the sorted ids of the songs containing it, stored as
+# flat NumPy arrays (gram keys, offsets, postings) so it saves and loads quickly.
+# The songs themselves are not saved with it, but read again from the library.
+#
+# A query is normalized the same way. The grams each song shares with it are
+# counted over the postings of its grams, and songs are ranked by their Dice
+# coefficient (shared grams relative to the grams of both texts), which a typo
+# only lowers a little. Only songs sharing enough grams to possibly rank among
+# the best are looked at, so a query never sorts a large part of the library.
+# The best of these are then scored with fuzzywuzzy: partial_ratio finds a
+# title or artist anywhere in the text, token_set_ratio the same words in any
+# order.
+#
+# Grams found in a large share of the library ("the", " lo") say little about
+# which song is meant but have the longest postings, so they are left out of
+# the counting as long as the query has rarer grams to go on.
+
+GRAM_SIZE = 3
+# Songs ranked by grams that get a full fuzzy score
+CANDIDATES = 30
+# Grams in more than this share of the songs are left out of the counting
+COMMON_GRAM_SHARE = 0.05
+
+
+def index_file_for(library_file):
+    """Path of the search index kept next to an organized library."""
+    return os.path.splitext(library_file)[0] + '.search.npz'
+
+
+def _search_texts(df):
+    """Normalized ' title artists album ' text of every song, as a NumPy array of str."""
+    if not len(df):
+        return np.zeros(0, dtype=str)
+    songs = normalized_songs(df)
+    albums = normalize_column(df['Album'], normalize_title) if 'Album' in df.columns else ''
+    texts = ' ' + songs['Song Name'] + ' ' + songs['Artist'].str.replace(',', '') + ' ' + albums + ' '
+    # Empty fields would leave double spaces, and grams across them
+    return texts.str.replace(r'\s+', ' ', regex=True).to_numpy(dtype=str)
+
+
+def _text_codes(texts, alphabet=None):
+    """
+    Character codes of texts, concatenated, as indexes into a sorted alphabet.
+
+    :param texts: Sequence of strings.
+    :param alphabet: Sorted code points to number against, or None to collect them.
+    :return: (codes, lengths, alphabet); codes of characters outside a given alphabet are -1.
+    """
+    lengths = np.array([len(text) for text in texts], dtype=np.int64)
+    points = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+    if alphabet is None:
+        alphabet, codes = np.unique(points, return_inverse=True)
+        return codes.astype(np.int64), lengths, alphabet
+    codes = np.searchsorted(alphabet, points)
+    found = codes < len(alphabet)
+    found[found] = alphabet[codes[found]] == points[found]
+    return np.where(found, codes, -1), lengths, alphabet
+
+
+def _gram_keys(codes, lengths, alphabet_size):
+    """
+    Integer key of every gram of the concatenated texts, with the text it is in.
+    Grams holding a character outside the alphabet get no key.
+
+    :return: (keys, text ids) arrays.
+    """
+    starts = np.cumsum(lengths) - lengths
+    count = len(codes) - GRAM_SIZE + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    text_ids = np.repeat(np.arange(len(lengths)), lengths)[:count]
+    # Grams must start far enough from the end of their text
+    valid = np.arange(count) - starts[text_ids] <= lengths[text_ids] - GRAM_SIZE
+    keys = np.zeros(count, dtype=np.int64)
+    for offset in range(GRAM_SIZE):
+        part = codes[offset:offset + count]
+        valid &= part >= 0
+        keys = keys * alphabet_size + part
+    return keys[valid], text_ids[valid]
+
+
+class SongSearch:
+    """
+    Typo-tolerant search over the song names, artists and albums of a library.
+    """
+    # Arrays written by save()
+    ARRAYS = ('texts', 'alphabet', 'postings', 'offsets', 'gram_keys', 'song_grams')
+
+    def __init__(self, df):
+        """
+        Builds the index.
+
+        :param df: pandas DataFrame containing the music library.
+        """
+        self.songs = df.reset_index(drop=True)
+        self.texts = _search_texts(self.songs)
+        codes, lengths, self.alphabet = _text_codes(self.texts)
+        keys, song_ids = _gram_keys(codes, lengths, len(self.alphabet))
+        if len(self.alphabet) ** GRAM_SIZE * max(len(self.songs), 1) >= 2 ** 63:
+            # Number the grams in use first, so gram and song still fit in one integer
+            _, keys = np.unique(keys, return_inverse=True)
+        # One entry per distinct (gram, song), sorted by gram and then song
+        size = max(len(self.songs), 1)
+        pairs = np.sort(keys * size + song_ids)
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))] if len(pairs) else pairs
+        grams = pairs // size
+        firsts = np.flatnonzero(np.concatenate(([True], grams[1:] != grams[:-1]))) if len(grams) else grams
+        self.postings = (pairs % size).astype(np.int32)
+        self.offsets = np.append(firsts, len(pairs))
+        self.gram_keys = grams[firsts]
+        self.song_grams = np.bincount(self.postings, minlength=len(self.songs))
+
+    def __len__(self):
+        return len(self.songs)
+
+    def save(self, path, library=None):
+        """
+        Saves the index arrays, so later searches skip building it.
+
+        :param path: Path of the file to write.
+        :param library: Optional (size, modification time) of the library the index was built from.
+        """
+        with open(path, 'wb') as file:
+            np.savez(file, library=np.array(library if library else (-1, -1), dtype=np.int64),
+                     **{name: getattr(self, name) for name in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path, df, library=None):
+        """
+        Loads an index written by save(), without unpickling anything.
+
+        :param path: Path of the file written by save().
+        :param df: pandas DataFrame of the library the index was built from.
+        :param library: Optional (size, modification time) the library must have been saved with.
+        :return: SongSearch, or None if the index does not belong to that library.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if library and tuple(data['library'].tolist()) != tuple(library):
+                return None
+            search = cls.__new__(cls)
+            for name in cls.ARRAYS:
+                setattr(search, name, data[name])
+        search.songs = df.reset_index(drop=True)
+        return search if len(search.texts) == len(search.songs) else None
+
+    def _query_grams(self, text):
+        """Distinct gram ids of a normalized query that occur in the library, and its gram count."""
+        codes, lengths, _ = _text_codes([text], self.alphabet)
+        keys = np.unique(_gram_keys(codes, lengths, len(self.alphabet))[0])
+        positions = np.searchsorted(self.gram_keys, keys)
+        known = positions < len(self.gram_keys)
+        known[known] = self.gram_keys[positions[known]] == keys[known]
+        # Grams with unknown characters still count towards the query's size
+        size = len({text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)})
+        return positions[known], max(size, 1)
+
+    def _dice(self, shared, least, query_size):
+        """Songs sharing at least `least` grams with a query, with their Dice coefficients."""
+        song_ids = np.flatnonzero(shared >= least)
+        return song_ids, 2 * shared[song_ids] / (query_size + self.song_grams[song_ids])
+
+    def candidates(self, query, count=CANDIDATES):
+        """
+        Songs sharing the most grams with a query.
+
+        :param query: Raw query string.
+        :param count: Number of songs to return at most.
+        :return: (song ids, Dice coefficients) arrays, best first.
+        """
+        text = ' ' + normalize_title(query) + ' '
+        grams, query_size = self._query_grams(text)
+        frequencies = self.offsets[grams + 1] - self.offsets[grams]
+        rare = grams[frequencies <= max(COMMON_GRAM_SHARE * len(self), 1)]
+        if len(rare):
+            grams = rare
+        if not len(grams):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        # Each song is in a gram's postings once, so a plain indexed add counts it right
+        shared = np.zeros(len(self), dtype=np.uint8)
+        for gram in grams[:np.iinfo(np.uint8).max]:
+            shared[self.postings[self.offsets[gram]:self.offsets[gram + 1]]] += 1
+
+        # Songs sharing at least `least` grams number `count` or more, if any number
+        # does; the worst Dice coefficient among the best `count` of them is a bar
+        # every result must reach
+        least = next((shares for shares in range(min(len(grams), np.iinfo(np.uint8).max), 1, -1)
+                      if np.count_nonzero(shared >= shares) >= count), 1)
+        song_ids, dice = self._dice(shared, least, query_size)
+        if least > 1 and len(song_ids) >= count:
+            bar = np.partition(dice, len(dice) - count)[len(dice) - count]
+            # A song sharing s grams has at least s of its own, so its Dice is at most
+            # 2s / (query + s), which reaches the bar from this many shared grams on
+            reach = max(int(np.ceil(bar * query_size / (2 - bar) - 1e-9)), 1)
+            if reach < least:
+                song_ids, dice = self._dice(shared, reach, query_size)
+        if len(song_ids) > count:
+            best = np.argpartition(-dice, count - 1)[:count]
+            song_ids, dice = song_ids[best], dice[best]
+        order = np.argsort(-dice, kind='stable')
+        return song_ids[order], dice[order]
+
+    def search(self, query, limit=10, min_score=60):
+        """
+        Finds the songs best matching a query, allowing for typos.
+
+        :param query: Song name, artist and/or album, in any order, e.g. 'bohemain rapsody queen'.
+        :param limit: Number of songs to return at most.
+        :param min_score: Lowest fuzzy score (0-100) of a returned song.
+        :return: DataFrame of the matching songs with a 'Score' column, best first.
+        """
+        song_ids, dice = self.candidates(query, max(limit, CANDIDATES))
+        text = normalize_title(query)
+        scores = np.array([max(fuzz.partial_ratio(text, self.texts[song_id].strip()),
+                               fuzz.token_set_ratio(text, self.texts[song_id], full_process=False))
+                           for song_id in song_ids], dtype=np.int64)
+        keep = scores >= min_score
+        song_ids, dice, scores = song_ids[keep], dice[keep], scores[keep]
+        # Songs with equal scores are told apart by fuzz.WRatio, which weighs the
+        # whole text, and then by their gram overlap
+        values, counts = np.unique(scores, return_counts=True)
+        tied = np.flatnonzero(np.isin(scores, values[counts > 1]))
+        weights = np.zeros(len(scores), dtype=np.int64)
+        weights[tied] = [fuzz.WRatio(text, self.texts[song_id].strip(), full_process=False)
+                         for song_id in song_ids[tied]]
+        order = np.lexsort((-dice, -weights, -scores))[:limit]
+        results = self.songs.iloc[song_ids[order]].copy()
+        results['Score'] = scores[order]
+        return results
+
+
+def load_search(library_file):
+    """
+    Returns the search index of a library, building and saving it first if it is
+    missing or was built from another version of the library.
+
+    :param library_file: Path to the organized library (CSV or Parquet).
+    :return: SongSearch.
+    """
+    # Imported here so the search itself does not need the whole pipeline
+    from ew import library_stamp, load_csv
+    index_file = index_file_for(library_file)
+    library = library_stamp(library_file)
+    df = load_csv(library_file)
+    if os.path.exists(index_file):
+        try:
+            search = SongSearch.load(index_file, df, library)
+        except Exception as e:
+            print(f"Error loading the search index '{index_file}': {e}")
+            search = None
+        if search is not None:
+            return search
+    start = time.perf_counter()
+    search = SongSearch(df)
+    search.save(index_file, library)
+    print(f"Indexed {len(search)} songs in {time.perf_counter() - start:.1f} s, saved to '{index_file}'.")
+    return search
+
+
+# -------------------------------
+# Main Function
+# -------------------------------
+
+def print_results(results):
+    """Prints the songs found by SongSearch.search, one per line."""
+    if not len(results):
+        print("No matching songs.")
+        return
+    for _, song in results.iterrows():
+        print(f"{song['Score']:>4}  {song['Song Name']} - {song['Artist']}"
+              + (f" ({song['Album']})" if 'Album' in song and pd.notna(song['Album']) else ""))
+
+
+def main(argv=None):
+    """
+    Searches a library from the command line, building its index on first use.
+
+    :param argv: Optional list of arguments instead of sys.argv.
+    :return: Exit status, 0 on success.
+    """
+    parser = argparse.ArgumentParser(description="Search an organized music library, allowing for typos.")
+    parser.add_argument('query', nargs='*',
+                        help="song name, artist and/or album; without one, queries are read a line at a time")
+    parser.add_argument('-l', '--library', default='organized_music_library.csv',
+                        help="organized library (CSV or .parquet) to search (default: %(default)s)")
+    parser.add_argument('-n', '--limit', type=int, default=10, help="songs to show at most (default: %(default)s)")
+    parser.add_argument('-s', '--min-score', type=int, default=60,
+                        help="lowest score (0-100) to show (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.library):
+        print(f"Error: The library '{args.library}' does not exist.")
+        return 1
+
+    search = load_search(args.library)
+    queries = [' '.join(args.query)] if args.query else (line.strip() for line in sys.stdin)
+    for query in queries:
+        if not query:
+            continue
+        start = time.perf_counter()
+        results = search.search(query, args.limit, args.min_score)
+        print(f"--- '{query}' ({(time.perf_counter() - start) * 1000:.1f} ms) ---")
+        print_results(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())